@@ -1,35 +1,96 @@
-from flask import Flask, render_template_string, request, jsonify, redirect, url_for
+from flask import Flask, Response, make_response, render_template, request, jsonify, redirect, stream_with_context, url_for
 import os
 import base64
 import pickle
 import json
+import re
 import time
+import atexit
+import threading
 import tempfile
+import hashlib
+import heapq
+import multiprocessing
+import sqlite3
+import uuid
+import functools
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from flask.json.provider import DefaultJSONProvider
 from werkzeug.utils import secure_filename
 import PyPDF2
-from openai import OpenAI
+try:
+    import orjson  # Faster JSON parsing/serialization for the storage file when installed
+except ImportError:
+    orjson = None
+try:
+    import pymupdf  # Much faster text extraction than PyPDF2 when installed
+except ImportError:
+    pymupdf = None
+try:
+    from flask_compress import Compress  # Brotli/gzip response compression when installed
+except ImportError:
+    Compress = None
 import numpy as np
 import faiss
+from utils.llm_cache import make_cache_key, get_cached_completion, store_completion
+# Both apps share utils.openai_helper's pooled OpenAI client, so concurrent
+# embedding batches reuse its keep-alive connections
+from utils.openai_helper import CHARS_PER_TOKEN, CONTEXT_TOKEN_BUDGET, client, get_tokenizer, limit_context
 
-# Initialize OpenAI client
-api_key = os.environ.get("OPENAI_API_KEY")
-client = OpenAI(api_key=api_key)
+class OrjsonProvider(DefaultJSONProvider):
+    """JSON provider that encodes with orjson, deferring other types to Flask's defaults."""
+    
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(
+            obj, default=self.default, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        ).decode("utf-8")
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+def use_fast_json(flask_app):
+    """Serve jsonify() and request JSON through orjson when it's installed."""
+    if orjson is not None:
+        flask_app.json = OrjsonProvider(flask_app)
 
 app = Flask(__name__)
+use_fast_json(app)
+
+# Compress text responses; the large home page shrinks several times over
+if Compress is not None:
+    app.config["COMPRESS_MIMETYPES"] = ["text/html", "text/css", "text/javascript", "application/javascript", "application/json"]
+    app.config["COMPRESS_ALGORITHM"] = ["br", "gzip"]
+    app.config["COMPRESS_BR_LEVEL"] = 5
+    Compress(app)
 
 # Ensure storage directories exist
+UPLOADS_DIR = "data_storage/uploads"
 os.makedirs("data_storage", exist_ok=True)
-os.makedirs("data_storage/uploads", exist_ok=True)
+os.makedirs(UPLOADS_DIR, exist_ok=True)
+
+# Large payloads (document chunks) live in per-session sidecar files;
+# data.json only keeps a small manifest pointing at them
+SESSIONS_DIR = "data_storage/sessions"
+os.makedirs(SESSIONS_DIR, exist_ok=True)
 
 # Simple file-based storage system
+# Writes are coalesced so a burst of updates rewrites data.json at most once per interval
+SAVE_DELAY_SECONDS = 1.0
+
 class SimpleStorage:
     def __init__(self):
         self.storage_path = "data_storage/data.json"
         self.data = self._load_data()
+        self._lock = threading.RLock()
+        self._save_timer = None
         
     def _load_data(self):
         try:
             if os.path.exists(self.storage_path):
+                if orjson is not None:
+                    with open(self.storage_path, 'rb') as f:
+                        return orjson.loads(f.read())
                 with open(self.storage_path, 'r') as f:
                     return json.load(f)
             return {}
@@ -38,26 +99,81 @@ class SimpleStorage:
             return {}
         
     def _save_data(self):
-        try:
-            with open(self.storage_path, 'w') as f:
-                json.dump(self.data, f)
-            return True
-        except Exception as e:
-            print(f"Error saving data: {e}")
-            return False
+        with self._lock:
+            self._save_timer = None
+            try:
+                # Write to a temp file and swap it in so a crash never leaves a truncated file
+                temp_path = f"{self.storage_path}.tmp"
+                if orjson is not None:
+                    with open(temp_path, 'wb') as f:
+                        f.write(orjson.dumps(self.data, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY))
+                else:
+                    with open(temp_path, 'w') as f:
+                        json.dump(self.data, f)
+                os.replace(temp_path, self.storage_path)
+                return True
+            except RuntimeError as e:
+                # Another thread mutated the data mid-dump; try again shortly
+                print(f"Error saving data: {e}")
+                self.save()
+                return False
+            except Exception as e:
+                # Disk and encoding errors won't fix themselves; the next change retries
+                print(f"Error saving data: {e}")
+                return False
+        
+    def save(self):
+        """Schedule a write of the data file, coalescing writes within SAVE_DELAY_SECONDS."""
+        with self._lock:
+            if self._save_timer is None:
+                self._save_timer = threading.Timer(SAVE_DELAY_SECONDS, self._save_data)
+                self._save_timer.daemon = True
+                self._save_timer.start()
+                
+    def flush(self):
+        """Write any pending changes immediately."""
+        with self._lock:
+            if self._save_timer is None:
+                return True
+            self._save_timer.cancel()
+            return self._save_data()
         
     def __getitem__(self, key):
         return self.data.get(key)
         
     def __setitem__(self, key, value):
         self.data[key] = value
-        self._save_data()
+        self.save()
         
     def __contains__(self, key):
         return key in self.data
 
 # Initialize storage
 storage = SimpleStorage()
+atexit.register(storage.flush)
+if "sessions" not in storage:
+    storage["sessions"] = {}
+
+# Read-modify-write updates to a session's data hold that session's lock.
+# Locks are sharded by session ID so different sessions rarely contend.
+SESSION_LOCK_SHARDS = 16
+session_locks = [threading.RLock() for _ in range(SESSION_LOCK_SHARDS)]
+
+def get_session_lock(session_id):
+    """Get the lock guarding updates to a session's stored data."""
+    return session_locks[hash(session_id) % SESSION_LOCK_SHARDS]
+
+def get_session_data(session_id):
+    """Get a session's stored data, creating an empty entry if needed."""
+    with get_session_lock(session_id):
+        sessions = storage["sessions"]
+        if session_id not in sessions:
+            sessions[session_id] = {
+                "created_at": time.time(),
+                "documents": {},
+                "diagrams": []
+            }
+        return sessions[session_id]
 
 # Session management
 def get_current_session():
@@ -73,15 +189,7 @@ def create_new_session():
     storage["current_session"] = session_id
     
     # Initialize session data
-    if "sessions" not in storage:
-        storage["sessions"] = {}
-        
-    storage["sessions"][session_id] = {
-        "created_at": time.time(),
-        "documents": {},
-        "chat_history": [],
-        "diagrams": []
-    }
+    get_session_data(session_id)
     
     return session_id
 
@@ -106,49 +214,181 @@ def decode_from_storage(encoded_obj):
         print(f"Error decoding object: {e}")
         return None
 
+def get_session_dir(session_id):
+    """Get the directory holding a session's sidecar files."""
+    session_dir = os.path.join(SESSIONS_DIR, secure_filename(session_id))
+    os.makedirs(session_dir, exist_ok=True)
+    return session_dir
+
+def write_pickle_file(path, obj):
+    """Pickle an object straight to disk, replacing any previous file atomically."""
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'wb') as f:
+        pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temp_path, path)
+
+def read_pickle_file(path):
+    """Load a pickled object from disk."""
+    try:
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+    except Exception as e:
+        print(f"Error reading {path}: {e}")
+        return None
+
+@functools.lru_cache(maxsize=64)
+def read_chunks_file(path, mtime):
+    """Load a document's chunk file, memoized on its path and modification time."""
+    return read_pickle_file(path)
+
 # Document processing
+# Pages are split into overlapping token windows before embedding
+CHUNK_TOKENS = 500
+CHUNK_OVERLAP_TOKENS = 50
+
+def split_text_into_windows(text, size=CHUNK_TOKENS, overlap=CHUNK_OVERLAP_TOKENS):
+    """Split text into overlapping windows of roughly `size` tokens."""
+    tokenizer = get_tokenizer(EMBEDDING_MODEL)
+    step = size - overlap
+    
+    if tokenizer is not None:
+        tokens = tokenizer.encode(text)
+        return [tokenizer.decode(tokens[start:start + size])
+                for start in range(0, max(len(tokens) - overlap, 1), step)]
+    
+    size, step = size * CHARS_PER_TOKEN, step * CHARS_PER_TOKEN
+    return [text[start:start + size]
+            for start in range(0, max(len(text) - overlap * CHARS_PER_TOKEN, 1), step)]
+
+def page_text_chunks(text, page_num, source):
+    """Build the chunk dicts for one page of text."""
+    return [
+        {
+            "content": window,
+            "metadata": {
+                "page": page_num,
+                "source": source,
+                "chunk": chunk_num
+            }
+        }
+        for chunk_num, window in enumerate(split_text_into_windows(text), start=1)
+        if window.strip()
+    ]
+
 def extract_text_from_pdf(file_path):
     """Extract text from a PDF file."""
     try:
         text_chunks = []
+        source = os.path.basename(file_path)
+        
+        if pymupdf is not None:
+            # Iterate pages directly and skip layout analysis for plain text
+            text_flags = pymupdf.TEXT_DEHYPHENATE | pymupdf.TEXT_MEDIABOX_CLIP
+            with pymupdf.open(file_path) as doc:
+                for page_num, page in enumerate(doc, start=1):
+                    text = page.get_text("text", flags=text_flags)
+                    
+                    if text and text.strip():
+                        text_chunks.extend(page_text_chunks(text, page_num, source))
+            return text_chunks
+            
         with open(file_path, 'rb') as file:
             reader = PyPDF2.PdfReader(file)
             
-            for page_num in range(len(reader.pages)):
-                page = reader.pages[page_num]
+            for page_num, page in enumerate(reader.pages, start=1):
                 text = page.extract_text()
                 
                 if text and text.strip():
-                    text_chunks.append({
-                        "content": text,
-                        "metadata": {
-                            "page": page_num + 1,
-                            "source": os.path.basename(file_path)
-                        }
-                    })
+                    text_chunks.extend(page_text_chunks(text, page_num, source))
                 
         return text_chunks
     except Exception as e:
         print(f"Error extracting text from PDF: {e}")
         return []
 
-def save_document_chunks(document_name, text_chunks):
+# Shared pool so several uploaded PDFs are parsed at the same time. Parsing is
+# CPU-bound and holds the GIL, so each file goes to its own process. Workers
+# come from a forkserver rather than forking this process, which by then runs
+# request, executor and OpenMP threads whose held locks a fork would copy.
+pdf_executor = None
+pdf_executor_lock = threading.Lock()
+
+def get_pdf_executor():
+    """Start the PDF parsing pool on first use."""
+    global pdf_executor
+    with pdf_executor_lock:
+        if pdf_executor is None:
+            pdf_executor = ProcessPoolExecutor(
+                max_workers=os.cpu_count() or 1,
+                mp_context=multiprocessing.get_context("forkserver")
+            )
+        return pdf_executor
+
+# Extracted chunks are cached by file content, so re-uploading a PDF skips
+# parsing it (and its chunks' embeddings are already in the embedding cache)
+CHUNK_CACHE_DIR = "data_storage/chunk_cache"
+os.makedirs(CHUNK_CACHE_DIR, exist_ok=True)
+
+def get_chunk_cache_path(file_path):
+    """Get the cache location for a PDF's chunks, keyed by its bytes and the chunking settings."""
+    digest = hashlib.blake2b(f"{CHUNK_TOKENS}\0{CHUNK_OVERLAP_TOKENS}\0".encode('utf-8'), digest_size=16)
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return os.path.join(CHUNK_CACHE_DIR, f"{digest.hexdigest()}.pkl")
+
+def extract_text_from_pdfs(file_paths):
+    """Extract text from several PDF files concurrently, in input order."""
+    cache_paths = [get_chunk_cache_path(file_path) for file_path in file_paths]
+    results = [None] * len(file_paths)
+    missing = []
+    
+    for i, (file_path, cache_path) in enumerate(zip(file_paths, cache_paths)):
+        cached = read_pickle_file(cache_path) if os.path.exists(cache_path) else None
+        if cached is None:
+            missing.append(i)
+            continue
+        
+        # The same bytes may arrive under a different filename
+        source = os.path.basename(file_path)
+        results[i] = [{"content": chunk["content"], "metadata": {**chunk["metadata"], "source": source}} for chunk in cached]
+    
+    if missing:
+        for i, text_chunks in zip(missing, get_pdf_executor().map(extract_text_from_pdf, [file_paths[i] for i in missing])):
+            results[i] = text_chunks
+            # An empty result may be a parse error, so only successes are cached
+            if text_chunks:
+                try:
+                    write_pickle_file(cache_paths[i], text_chunks)
+                except Exception as e:
+                    print(f"Error caching chunks for {file_paths[i]}: {e}")
+    
+    return results
+
+def save_document_chunks(document_name, text_chunks, session_id=None):
     """Save document chunks to storage."""
-    session_id = get_current_session()
+    if session_id is None:
+        session_id = get_current_session()
     
     try:
-        if "sessions" not in storage:
-            storage["sessions"] = {}
+        session_data = get_session_data(session_id)
             
-        if session_id not in storage["sessions"]:
-            storage["sessions"][session_id] = {
-                "created_at": time.time(),
-                "documents": {},
-                "chat_history": [],
-                "diagrams": []
+        # Pickle straight to a sidecar file instead of base64 inside data.json
+        chunks_path = os.path.join(get_session_dir(session_id), f"{secure_filename(document_name)}.pkl")
+        write_pickle_file(chunks_path, text_chunks)
+        
+        with get_session_lock(session_id):
+            session_data["documents"][document_name] = {
+                "file": chunks_path,
+                "num_chunks": len(text_chunks),
+                "saved_at": time.time()
             }
             
-        storage["sessions"][session_id]["documents"][document_name] = encode_for_storage(text_chunks)
+            # The session's index no longer covers all of its documents
+            with vector_store_cache_lock:
+                vector_store_cache.pop(session_id, None)
+        
+        storage.save()
         return True
     except Exception as e:
         print(f"Error saving document chunks: {e}")
@@ -166,8 +406,19 @@ def get_document_chunks(session_id=None):
         documents = storage["sessions"][session_id]["documents"]
         result = {}
         
-        for doc_name, encoded_chunks in documents.items():
-            decoded_chunks = decode_from_storage(encoded_chunks)
+        for doc_name, entry in documents.items():
+            if isinstance(entry, dict):
+                try:
+                    mtime = os.path.getmtime(entry["file"])
+                except OSError as e:
+                    # A lost chunk file only drops its own document, not the whole session
+                    print(f"Skipping document {doc_name}: {e}")
+                    continue
+                # A rewritten file gets a new mtime, so stale cache entries are never hit
+                decoded_chunks = read_chunks_file(entry["file"], mtime)
+            else:
+                # Older sessions stored base64-encoded pickles inline
+                decoded_chunks = decode_from_storage(entry)
             if decoded_chunks is not None:
                 result[doc_name] = decoded_chunks
                 
@@ -187,59 +438,189 @@ def get_all_document_chunks(session_id=None):
     return all_chunks
 
 # Vector store functions
-# Create a simple in-memory cache for embeddings
-embedding_cache = {}
+# Recently used embeddings are kept in memory; the disk cache holds the rest
+EMBEDDING_MEMORY_CACHE_SIZE = 20000
+embedding_cache = OrderedDict()
+embedding_cache_lock = threading.Lock()
 
-def get_embedding(text):
-    """Get embedding for text using OpenAI with caching."""
-    try:
-        # Clean and standardize the text
-        text = text.replace("\n", " ").strip()
+def remember_embedding(cache_key, embedding):
+    """Add an embedding to the in-memory LRU, evicting the oldest if full."""
+    with embedding_cache_lock:
+        embedding_cache[cache_key] = embedding
+        embedding_cache.move_to_end(cache_key)
+        if len(embedding_cache) > EMBEDDING_MEMORY_CACHE_SIZE:
+            embedding_cache.popitem(last=False)
+
+# OpenAI's embeddings endpoint accepts a list of inputs per request
+EMBEDDING_MODEL = "text-embedding-3-small"
+EMBEDDING_BATCH_SIZE = 100
+EMBEDDING_MAX_CONCURRENCY = 4  # Batches in flight at once
+
+# Embeddings also persist on disk by content hash, so re-uploaded or
+# re-indexed documents skip the API entirely
+EMBEDDING_CACHE_DIR = "data_storage/embed_cache"
+
+def get_embedding_cache_key(text):
+    """Get the content-addressed cache key for a text's embedding."""
+    return hashlib.sha256(f"{EMBEDDING_MODEL}\0{text}".encode('utf-8')).hexdigest()
+
+def get_embedding_cache_path(cache_key):
+    """Get the on-disk location of a cached embedding."""
+    return os.path.join(EMBEDDING_CACHE_DIR, cache_key[:2], f"{cache_key}.npy")
+
+def load_cached_embedding(cache_key):
+    """Look up an embedding in memory, then on disk."""
+    with embedding_cache_lock:
+        embedding = embedding_cache.get(cache_key)
+        if embedding is not None:
+            embedding_cache.move_to_end(cache_key)
+            return embedding
         
-        # Use a hash of the text as the cache key
-        cache_key = hash(text)
+    cache_path = get_embedding_cache_path(cache_key)
+    if os.path.exists(cache_path):
+        try:
+            embedding = np.load(cache_path)
+            remember_embedding(cache_key, embedding)
+        except Exception as e:
+            print(f"Error reading cached embedding: {e}")
+    return embedding
+
+def store_cached_embedding(cache_key, embedding):
+    """Keep an embedding in memory and write it to the disk cache."""
+    remember_embedding(cache_key, embedding)
+    try:
+        cache_path = get_embedding_cache_path(cache_key)
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        temp_path = f"{cache_path}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'wb') as f:
+            np.save(f, embedding)
+        os.replace(temp_path, cache_path)
+    except Exception as e:
+        print(f"Error writing cached embedding: {e}")
+
+def get_embeddings(texts):
+    """Get embeddings for a batch of texts using a single OpenAI request with caching."""
+    try:
+        # Clean and standardize the texts
+        texts = [text.replace("\n", " ").strip() for text in texts]
         
-        # Check if we have a cached embedding
-        if cache_key in embedding_cache:
-            print(f"Using cached embedding (text length: {len(text)})")
-            return embedding_cache[cache_key]
-            
-        print(f"Generating new embedding for text (length: {len(text)})")
-        max_retries = 3  # Reduced number of retries
-        retry_delay = 1.0  # seconds
+        # Only send texts we haven't embedded before (deduplicated, order preserved)
+        cache_keys = [get_embedding_cache_key(text) for text in texts]
+        cached = {key: load_cached_embedding(key) for key in dict.fromkeys(cache_keys)}
+        missing = list(dict.fromkeys(text for text, key in zip(texts, cache_keys) if cached[key] is None))
         
-        for attempt in range(max_retries):
-            try:
-                start_time = time.time()
-                response = client.embeddings.create(
-                    input=text,
-                    model="text-embedding-3-small",
-                    timeout=10  # Add a timeout of 10 seconds
-                )
-                embedding = np.array(response.data[0].embedding, dtype=np.float32)
-                
-                # Cache the result
-                embedding_cache[cache_key] = embedding
-                
-                end_time = time.time()
-                print(f"Embedding generated in {end_time - start_time:.2f} seconds")
-                return embedding
-            except Exception as e:
-                if "rate_limit_exceeded" in str(e) and attempt < max_retries - 1:
-                    print(f"Rate limit exceeded, retrying in {retry_delay} seconds...")
-                    time.sleep(retry_delay)
-                    retry_delay *= 2  # Exponential backoff
-                else:
-                    print(f"Failed to get embedding on attempt {attempt+1}: {str(e)}")
-                    if attempt == max_retries - 1:
-                        raise
+        if missing:
+            print(f"Generating {len(missing)} new embeddings ({len(texts) - len(missing)} cached)")
+            max_retries = 3  # Reduced number of retries
+            retry_delay = 1.0  # seconds
+            
+            for attempt in range(max_retries):
+                try:
+                    start_time = time.time()
+                    response = client.embeddings.create(
+                        input=missing,
+                        model=EMBEDDING_MODEL,
+                        timeout=30  # One request now carries the whole batch
+                    )
+                    
+                    # Cache the results; data items carry the index of their input
+                    for item in response.data:
+                        cache_key = get_embedding_cache_key(missing[item.index])
+                        cached[cache_key] = np.asarray(item.embedding, dtype=np.float32)
+                        store_cached_embedding(cache_key, cached[cache_key])
+                    
+                    end_time = time.time()
+                    print(f"Embeddings generated in {end_time - start_time:.2f} seconds")
+                    break
+                except Exception as e:
+                    if "rate_limit_exceeded" in str(e) and attempt < max_retries - 1:
+                        # Honour the server's Retry-After hint when it sends one
+                        headers = getattr(getattr(e, "response", None), "headers", None) or {}
+                        try:
+                            wait_time = float(headers.get("retry-after", retry_delay))
+                        except (TypeError, ValueError):
+                            wait_time = retry_delay
+                        print(f"Rate limit exceeded, retrying in {wait_time} seconds...")
+                        time.sleep(wait_time)
+                        retry_delay *= 2  # Exponential backoff
+                    else:
+                        print(f"Failed to get embeddings on attempt {attempt+1}: {str(e)}")
+                        if attempt == max_retries - 1:
+                            raise
         
-        # If we get here, all retries failed
-        print("All embedding attempts failed")
-        return None
+        return np.stack([cached[key] for key in cache_keys])
     except Exception as e:
-        print(f"Error getting embedding: {e}")
+        print(f"Error getting embeddings: {e}")
+        return None
+
+def get_embedding(text):
+    """Get embedding for a single text using OpenAI with caching."""
+    embeddings = get_embeddings([text])
+    if embeddings is None:
         return None
+    return embeddings[0]
+
+# HNSW gives sublinear search on larger corpora; below this size an exact
+# flat scan is as fast and avoids the graph build cost
+HNSW_MIN_VECTORS = 1000
+HNSW_M = 32  # Graph neighbours per node
+HNSW_EF_CONSTRUCTION = 40
+HNSW_EF_SEARCH = 64  # Search breadth; higher trades speed for recall
+
+# Large indexes store int8 codes (a quarter of the fp32 size); optionally
+# re-rank candidates against fp16 copies when recall matters more than memory
+SQ_REFINE_FP16 = False
+SQ_REFINE_K_FACTOR = 4
+
+# Very large sessions switch to product quantization (~32 bytes per vector).
+# The number of inverted lists grows as 4*sqrt(N) so each list stays short,
+# but never beyond N / PQ_MIN_POINTS_PER_LIST so k-means has enough points to
+# train every centroid; past PQ_LARGE_MIN_VECTORS more lists are probed to hold
+# recall. Training (the OPQ rotation on 1536-d vectors especially) takes a while,
+# which is fine because it runs in the background ingest job.
+PQ_MIN_VECTORS = 10000
+PQ_MIN_LISTS = 256
+PQ_MIN_POINTS_PER_LIST = 39  # faiss warns about undertrained clusters below this
+PQ_INDEX_FACTORY = "OPQ32_64,IVF{nlist}_HNSW32,PQ32"
+PQ_NPROBE = 8  # Inverted lists scanned per query
+PQ_LARGE_MIN_VECTORS = 50000
+PQ_LARGE_NPROBE = 16
+
+def create_faiss_index(embeddings_array):
+    """Build an inner-product FAISS index sized to the corpus and add the embeddings to it.
+    
+    Embeddings must already be L2-normalized, so inner product equals cosine similarity.
+    """
+    num_vectors, dimension = embeddings_array.shape
+    
+    if num_vectors < HNSW_MIN_VECTORS:
+        print(f"Creating flat FAISS index with dimension {dimension}")
+        index = faiss.IndexFlatIP(dimension)
+    elif num_vectors >= PQ_MIN_VECTORS:
+        nlist = min(max(PQ_MIN_LISTS, int(4 * np.sqrt(num_vectors))), num_vectors // PQ_MIN_POINTS_PER_LIST)
+        index_factory = PQ_INDEX_FACTORY.format(nlist=nlist)
+        print(f"Creating {index_factory} FAISS index with dimension {dimension}")
+        index = faiss.index_factory(dimension, index_factory, faiss.METRIC_INNER_PRODUCT)
+        
+        # Trains the rotation, coarse quantizer and PQ codebooks in one pass
+        index.train(embeddings_array)
+        faiss.extract_index_ivf(index).nprobe = PQ_LARGE_NPROBE if num_vectors >= PQ_LARGE_MIN_VECTORS else PQ_NPROBE
+    else:
+        print(f"Creating HNSW int8 FAISS index with dimension {dimension}")
+        index = faiss.IndexHNSWSQ(dimension, faiss.ScalarQuantizer.QT_8bit, HNSW_M, faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+        index.hnsw.efSearch = HNSW_EF_SEARCH
+        
+        if SQ_REFINE_FP16:
+            refine_index = faiss.IndexScalarQuantizer(dimension, faiss.ScalarQuantizer.QT_fp16, faiss.METRIC_INNER_PRODUCT)
+            index = faiss.IndexRefine(index, refine_index)
+            index.k_factor = SQ_REFINE_K_FACTOR
+        
+        # The scalar quantizer learns per-dimension ranges from the data
+        index.train(embeddings_array)
+        
+    index.add(embeddings_array)
+    return index
 
 def create_vector_store(chunks):
     """Create a FAISS vector store from chunks."""
@@ -251,69 +632,69 @@ def create_vector_store(chunks):
         print(f"Creating vector store for {len(chunks)} chunks")
         start_time = time.time()
         
-        # Get embeddings for chunks
+        # The embeddings endpoint rejects empty inputs
+        chunks = [chunk for chunk in chunks if chunk.get("content", "").strip()]
         chunk_texts = [chunk["content"] for chunk in chunks]
-        embeddings = []
-        chunk_map = {}  # To keep track of which chunks correspond to which embeddings
         
-        # Process in batches to avoid rate limits
-        batch_size = 10  # Increased batch size for efficiency
-        total_embeddings = 0
+        # Send each batch as a single embeddings request
+        batch_size = EMBEDDING_BATCH_SIZE
+        batches = [chunk_texts[i:i+batch_size] for i in range(0, len(chunk_texts), batch_size)]
         
-        print(f"Processing chunks in batches of {batch_size}")
-        for i in range(0, len(chunk_texts), batch_size):
-            batch = chunk_texts[i:i+batch_size]
-            batch_indices = list(range(i, min(i+batch_size, len(chunk_texts))))
-            
-            print(f"Processing batch {i//batch_size + 1}/{(len(chunk_texts) + batch_size - 1)//batch_size}: {len(batch)} chunks")
+        def embed_batch(batch_num):
             batch_start = time.time()
-            
-            # Process each chunk in the batch
-            for j, (text, orig_idx) in enumerate(zip(batch, batch_indices)):
-                embedding = get_embedding(text)
-                if embedding is not None:
-                    embeddings.append(embedding)
-                    chunk_map[len(embeddings) - 1] = chunks[orig_idx]  # Map embedding index to original chunk
-                    total_embeddings += 1
-            
+            batch_embeddings = get_embeddings(batches[batch_num])
             batch_end = time.time()
-            print(f"Batch processed in {batch_end - batch_start:.2f} seconds, total embeddings: {total_embeddings}")
+            print(f"Batch {batch_num + 1}/{len(batches)} ({len(batches[batch_num])} chunks) processed in {batch_end - batch_start:.2f} seconds")
+            return batch_embeddings
+        
+        # Requests are network-bound, so keep a few batches in flight at once.
+        # map() yields results in submission order, keeping rows aligned with chunks.
+        print(f"Processing {len(batches)} batches of up to {batch_size} chunks ({EMBEDDING_MAX_CONCURRENCY} concurrent)")
+        with ThreadPoolExecutor(max_workers=EMBEDDING_MAX_CONCURRENCY) as executor:
+            results = list(executor.map(embed_batch, range(len(batches))))
         
         # Make sure we have at least one embedding
-        if not embeddings:
+        embedded_batches = [batch_embeddings for batch_embeddings in results if batch_embeddings is not None]
+        if not embedded_batches:
             print("No valid embeddings were generated.")
             return None
             
-        # Create FAISS index
-        dimension = len(embeddings[0])
-        print(f"Creating FAISS index with dimension {dimension}")
-        index = faiss.IndexFlatL2(dimension)
-        
-        # Make sure all embeddings have the same shape
-        filtered_embeddings = []
-        filtered_chunks = []
-        
-        for i, embedding in enumerate(embeddings):
-            if len(embedding) == dimension:
-                filtered_embeddings.append(embedding)
-                filtered_chunks.append(chunk_map[i])
-        
-        # Make sure we have at least one valid embedding after filtering
-        if not filtered_embeddings:
+        # Copy each batch into one preallocated matrix; rows of failed batches stay masked out
+        dimension = embedded_batches[0].shape[1]
+        embeddings_array = np.empty((len(chunk_texts), dimension), dtype=np.float32)
+        valid = np.zeros(len(chunk_texts), dtype=bool)
+        
+        for batch_num, batch_embeddings in enumerate(results):
+            # Make sure all embeddings have the same shape
+            if batch_embeddings is None or batch_embeddings.shape[1] != dimension:
+                continue
+            start = batch_num * batch_size
+            embeddings_array[start:start + len(batch_embeddings)] = batch_embeddings
+            valid[start:start + len(batch_embeddings)] = True
+        
+        # Zero vectors can't be normalized or ranked; drop them in the same vectorized pass
+        valid &= np.linalg.norm(embeddings_array, axis=1) > 0
+        if not valid.any():
             print("No consistent embeddings were found.")
             return None
         
-        print(f"Adding {len(filtered_embeddings)} embeddings to FAISS index")    
-        embeddings_array = np.array(filtered_embeddings).astype('float32')
-        index.add(embeddings_array)
+        if not valid.all():
+            embeddings_array = embeddings_array[valid]
+        filtered_chunks = [chunk for chunk, is_valid in zip(chunks, valid) if is_valid]
+        
+        # Normalize once (in place) so inner-product search ranks by cosine similarity
+        faiss.normalize_L2(embeddings_array)
+        
+        print(f"Adding {len(filtered_chunks)} embeddings to FAISS index")
+        index = create_faiss_index(embeddings_array)
         
         end_time = time.time()
         print(f"Vector store created in {end_time - start_time:.2f} seconds")
         
+        # The index holds its own copy of the vectors, so the raw array isn't kept
         return {
             "index": index,
-            "chunks": filtered_chunks,
-            "embeddings": embeddings_array
+            "chunks": filtered_chunks
         }
     except Exception as e:
         print(f"Error creating vector store: {e}")
@@ -321,6 +702,280 @@ def create_vector_store(chunks):
         traceback.print_exc()
         return None
 
+# Built vector stores by session ID, so questions don't re-embed every chunk.
+# Only recently used sessions stay in memory; others reload from their saved index.
+VECTOR_STORE_CACHE_SESSIONS = 8
+vector_store_cache = OrderedDict()
+vector_store_cache_lock = threading.Lock()
+
+def get_documents_signature(session_id):
+    """Describe which document versions a session currently holds."""
+    documents = storage["sessions"][session_id]["documents"]
+    return tuple(sorted(
+        (doc_name, entry["saved_at"] if isinstance(entry, dict) else None)
+        for doc_name, entry in documents.items()
+    ))
+
+def save_vector_store(session_id, signature, vector_store):
+    """Persist a session's FAISS index and chunks so restarts don't rebuild them."""
+    try:
+        session_dir = get_session_dir(session_id)
+        index_path = os.path.join(session_dir, "vector_store.faiss")
+        temp_path = f"{index_path}.tmp"
+        faiss.write_index(vector_store["index"], temp_path)
+        os.replace(temp_path, index_path)
+        
+        # Written last: a matching signature means the index beside it is complete
+        write_pickle_file(os.path.join(session_dir, "vector_store.pkl"), {
+            "signature": signature,
+            "chunks": vector_store["chunks"]
+        })
+    except Exception as e:
+        print(f"Error saving vector store: {e}")
+
+def load_vector_store(session_id, signature):
+    """Load a persisted vector store if it was built from the current documents."""
+    session_dir = get_session_dir(session_id)
+    index_path = os.path.join(session_dir, "vector_store.faiss")
+    meta_path = os.path.join(session_dir, "vector_store.pkl")
+    if not (os.path.exists(index_path) and os.path.exists(meta_path)):
+        return None
+        
+    meta = read_pickle_file(meta_path)
+    if not meta or meta["signature"] != signature:
+        return None
+        
+    try:
+        # Memory-map the vectors so the OS page cache, not the heap, holds them
+        index = faiss.read_index(index_path, faiss.IO_FLAG_MMAP)
+    except Exception as e:
+        print(f"Error loading vector store: {e}")
+        return None
+    print(f"Loaded persisted vector store for session {session_id}")
+    return {
+        "index": index,
+        "chunks": meta["chunks"]
+    }
+
+def get_vector_store(session_id=None):
+    """Get the vector store for a session, loading or building it on first use."""
+    if session_id is None:
+        session_id = get_current_session()
+        
+    try:
+        if "sessions" not in storage or session_id not in storage["sessions"]:
+            return None
+            
+        signature = get_documents_signature(session_id)
+        with vector_store_cache_lock:
+            cached = vector_store_cache.get(session_id)
+            if cached and cached["signature"] == signature:
+                vector_store_cache.move_to_end(session_id)
+                print(f"Using cached vector store for session {session_id}")
+                return cached["vector_store"]
+            
+        vector_store = load_vector_store(session_id, signature)
+        if vector_store is None:
+            vector_store = create_vector_store(get_all_document_chunks(session_id))
+            if vector_store is not None:
+                save_vector_store(session_id, signature, vector_store)
+        if vector_store is not None:
+            with vector_store_cache_lock:
+                vector_store_cache[session_id] = {
+                    "signature": signature,
+                    "vector_store": vector_store
+                }
+                vector_store_cache.move_to_end(session_id)
+                if len(vector_store_cache) > VECTOR_STORE_CACHE_SESSIONS:
+                    vector_store_cache.popitem(last=False)
+        return vector_store
+    except Exception as e:
+        print(f"Error getting vector store: {e}")
+        return None
+
+# Semantic answer cache: paraphrases of an earlier question in the same
+# session reuse its answer instead of calling the LLM again. Each session keeps
+# at most ANSWER_CACHE_MAX_ENTRIES answers, evicting the least recently used.
+ANSWER_CACHE_MIN_SIMILARITY = 0.93
+ANSWER_CACHE_MAX_ENTRIES = 256
+ANSWER_CACHE_SESSIONS = 8  # Sessions whose caches stay in memory
+answer_cache = OrderedDict()
+answer_cache_lock = threading.Lock()
+
+def embed_question(question):
+    """Get a question's L2-normalized embedding as a contiguous (1, d) float32 array, or None."""
+    embedding = get_embedding(question)
+    if embedding is None:
+        return None
+    return embedding.reshape(1, -1) / np.linalg.norm(embedding)
+
+def save_answer_cache(session_id, entry):
+    """Persist a session's answer cache next to its other sidecar files."""
+    try:
+        session_dir = get_session_dir(session_id)
+        index_path = os.path.join(session_dir, "answer_cache.faiss")
+        temp_path = f"{index_path}.tmp"
+        faiss.write_index(entry["index"], temp_path)
+        os.replace(temp_path, index_path)
+        
+        write_pickle_file(os.path.join(session_dir, "answer_cache.pkl"), {
+            "signature": entry["signature"],
+            "answers": entry["answers"],
+            "next_id": entry["next_id"]
+        })
+    except Exception as e:
+        print(f"Error saving answer cache: {e}")
+
+def load_answer_cache(session_id):
+    """Load a session's persisted answer cache, or None if there isn't one."""
+    session_dir = get_session_dir(session_id)
+    index_path = os.path.join(session_dir, "answer_cache.faiss")
+    meta_path = os.path.join(session_dir, "answer_cache.pkl")
+    if not (os.path.exists(index_path) and os.path.exists(meta_path)):
+        return None
+        
+    meta = read_pickle_file(meta_path)
+    if not meta:
+        return None
+    try:
+        index = faiss.read_index(index_path)
+    except Exception as e:
+        print(f"Error loading answer cache: {e}")
+        return None
+    return {
+        "signature": meta["signature"],
+        "index": index,
+        "answers": meta["answers"],
+        "next_id": meta["next_id"]
+    }
+
+def get_answer_cache_entry(session_id, signature):
+    """Get a session's answer cache if it matches the current documents (call with the lock held)."""
+    if session_id not in answer_cache:
+        answer_cache[session_id] = load_answer_cache(session_id)
+        if len(answer_cache) > ANSWER_CACHE_SESSIONS:
+            answer_cache.popitem(last=False)
+    answer_cache.move_to_end(session_id)
+    entry = answer_cache[session_id]
+    
+    # Answers are only valid for the documents they were generated from
+    if not entry or entry["signature"] != signature:
+        return None
+    return entry
+
+def get_cached_answer(question, session_id):
+    """Return the answer to a near-identical earlier question in this session, if any."""
+    try:
+        signature = get_documents_signature(session_id)
+        with answer_cache_lock:
+            if get_answer_cache_entry(session_id, signature) is None:
+                return None
+        
+        # Embed outside the lock so other sessions aren't held up by the API call
+        query = embed_question(question)
+        if query is None:
+            return None
+        
+        with answer_cache_lock:
+            entry = get_answer_cache_entry(session_id, signature)
+            if entry is None or entry["index"].d != query.shape[1]:
+                return None
+            
+            similarities, ids = entry["index"].search(query, 1)
+            if ids[0][0] >= 0 and similarities[0][0] >= ANSWER_CACHE_MIN_SIMILARITY:
+                answer_id = int(ids[0][0])
+                entry["answers"].move_to_end(answer_id)
+                cached_question, answer = entry["answers"][answer_id]
+                print(f"Answer cache hit (similarity {similarities[0][0]:.3f}) for: '{cached_question[:50]}'")
+                return answer
+        return None
+    except Exception as e:
+        print(f"Error checking answer cache: {e}")
+        return None
+
+def cache_answer(question, answer, session_id):
+    """Remember an answer so paraphrased follow-ups can reuse it."""
+    try:
+        query = embed_question(question)
+        if query is None:
+            return
+        
+        signature = get_documents_signature(session_id)
+        with answer_cache_lock:
+            entry = get_answer_cache_entry(session_id, signature)
+            if entry is None or entry["index"].d != query.shape[1]:
+                # IDs stay stable as entries are evicted, so answers are keyed by ID.
+                # fp16 codes halve the cache's memory without moving similarities
+                # enough to matter against ANSWER_CACHE_MIN_SIMILARITY.
+                quantized_index = faiss.IndexScalarQuantizer(
+                    query.shape[1], faiss.ScalarQuantizer.QT_fp16, faiss.METRIC_INNER_PRODUCT
+                )
+                entry = answer_cache[session_id] = {
+                    "signature": signature,
+                    "index": faiss.IndexIDMap2(quantized_index),
+                    "answers": OrderedDict(),
+                    "next_id": 0
+                }
+            
+            answer_id = entry["next_id"]
+            entry["next_id"] += 1
+            entry["index"].add_with_ids(query, np.array([answer_id], dtype=np.int64))
+            entry["answers"][answer_id] = (question, answer)
+            
+            if len(entry["answers"]) > ANSWER_CACHE_MAX_ENTRIES:
+                evicted_id, _ = entry["answers"].popitem(last=False)
+                entry["index"].remove_ids(np.array([evicted_id], dtype=np.int64))
+            
+            save_answer_cache(session_id, entry)
+    except Exception as e:
+        print(f"Error caching answer: {e}")
+
+class QueryCoalescer:
+    """Batch searches that arrive while another search on the same index is running.
+    
+    A caller that finds the index idle searches straight away. Callers arriving
+    while that search is in flight queue up, and once it finishes the running
+    caller serves the whole queue with one FAISS search and hands each caller its row.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = {}  # id(index) -> queued (query_embedding, top_k, future); present while a search runs
+        
+    def search(self, index, query_embedding, top_k):
+        future = Future()
+        with self._lock:
+            queued = self._pending.get(id(index))
+            is_leader = queued is None
+            if is_leader:
+                self._pending[id(index)] = []
+            else:
+                queued.append((query_embedding, top_k, future))
+                
+        if is_leader:
+            batch = [(query_embedding, top_k, future)]
+            while batch:
+                self._run_batch(index, batch)
+                with self._lock:
+                    batch = self._pending.pop(id(index))
+                    if batch:
+                        # Keep the index marked busy while the queued batch runs
+                        self._pending[id(index)] = []
+                        
+        return future.result()
+    
+    @staticmethod
+    def _run_batch(index, batch):
+        try:
+            max_k = max(k for _, k, _ in batch)
+            distances, indices = index.search(np.vstack([query for query, _, _ in batch]), max_k)
+            for row, (_, k, waiting) in enumerate(batch):
+                waiting.set_result((distances[row:row + 1, :k], indices[row:row + 1, :k]))
+        except Exception as e:
+            for _, _, waiting in batch:
+                waiting.set_exception(e)
+
+query_coalescer = QueryCoalescer()
+
 def get_similar_chunks(query, vector_store, top_k=5):
     """Find chunks similar to query in vector store."""
     if not vector_store:
@@ -338,22 +993,23 @@ def get_similar_chunks(query, vector_store, top_k=5):
             print("Failed to generate embedding for query")
             return []
             
-        query_embedding = np.array([query_embedding]).astype('float32')
+        # Normalize into a new array; the embedding itself may be shared with the cache
+        query_embedding = query_embedding.reshape(1, -1) / np.linalg.norm(query_embedding)
         print("Query embedding generated successfully")
         
         # Search for similar chunks
         print(f"Searching for top {top_k} similar chunks...")
-        distances, indices = vector_store["index"].search(query_embedding, top_k)
+        distances, indices = query_coalescer.search(vector_store["index"], query_embedding, top_k)
         
-        # Get the chunks
-        similar_chunks = [vector_store["chunks"][idx] for idx in indices[0]]
+        # Get the chunks (FAISS pads missing results with -1)
+        similar_chunks = [vector_store["chunks"][idx] for idx in indices[0] if idx >= 0]
         
         end_time = time.time()
         print(f"Found {len(similar_chunks)} similar chunks in {end_time - start_time:.2f} seconds")
         
         # Print a preview of the chunks for debugging
         for i, chunk in enumerate(similar_chunks):
-            print(f"Chunk {i+1} (distance: {distances[0][i]:.4f}): {chunk['content'][:100]}...")
+            print(f"Chunk {i+1} (similarity: {distances[0][i]:.4f}): {chunk['content'][:100]}...")
             
         return similar_chunks
     except Exception as e:
@@ -363,23 +1019,46 @@ def get_similar_chunks(query, vector_store, top_k=5):
         return []
 
 # OpenAI helper functions
-def generate_answer(question, context_chunks, max_retries=3):
-    """Generate answer using OpenAI with retry mechanism."""
-    import time
+CHAT_MODEL = "gpt-4o"
+
+ANSWER_FAILED_MESSAGE = "Sorry, I was unable to generate an answer at this time. Please try asking a more specific question or try again later."
+
+def build_context(context_chunks, max_tokens=CONTEXT_TOKEN_BUDGET):
+    """Join chunk contents into a prompt context that fits the token budget."""
+    # Chunks arrive ranked by similarity, so context is filled best-first
+    parts = limit_context([chunk["content"] for chunk in context_chunks], max_tokens)
     
-    if not context_chunks:
-        return "I don't have enough information to answer this question. Please upload relevant documents."
-        
-    # Prepare context
-    context = "\n\n".join([chunk["content"] for chunk in context_chunks])
+    if len(parts) < len(context_chunks):
+        print(f"Context limited to {len(parts)} of {len(context_chunks)} chunks ({max_tokens} token budget)")
+    return "\n\n".join(parts)
+
+NO_CONTEXT_MESSAGE = "I don't have enough information to answer this question. Please upload relevant documents."
+
+def build_answer_messages(question, context_chunks):
+    """Construct the chat prompt for answering a question from document chunks."""
+    context = build_context(context_chunks)
     
-    # Construct the prompt
-    messages = [
+    return [
         {"role": "system", "content": "You are an AI assistant specialized in regulatory document analysis. "
                                      "Answer questions based ONLY on the provided context. "
                                      "If you don't know the answer based on the context, say so clearly."},
         {"role": "user", "content": f"Context information: {context}\n\nQuestion: {question}"}
     ]
+
+def generate_answer(question, context_chunks, max_retries=3):
+    """Generate answer using OpenAI with retry mechanism."""
+    import time
+    
+    if not context_chunks:
+        return NO_CONTEXT_MESSAGE
+        
+    messages = build_answer_messages(question, context_chunks)
+    
+    # Identical prompts (same question over the same context) skip the API call
+    cache_key = make_cache_key(CHAT_MODEL, None, messages)
+    cached_answer = get_cached_completion(cache_key)
+    if cached_answer is not None:
+        return cached_answer
     
     # Retry logic with exponential backoff
     retry_count = 0
@@ -399,6 +1078,7 @@ def generate_answer(question, context_chunks, max_retries=3):
             
             answer = response.choices[0].message.content
             print(f"Successfully generated answer on attempt {retry_count + 1}")
+            store_completion(cache_key, answer)
             return answer
             
         except Exception as e:
@@ -413,7 +1093,49 @@ def generate_answer(question, context_chunks, max_retries=3):
     
     # If all retries fail
     print(f"Failed after {max_retries} attempts. Last error: {last_error}")
-    return "Sorry, I was unable to generate an answer at this time. Please try asking a more specific question or try again later."
+    return ANSWER_FAILED_MESSAGE
+
+def generate_answer_stream(question, context_chunks):
+    """Generate an answer using OpenAI, yielding text as it arrives.
+    
+    The generator returns True if the whole answer was yielded, or False if the
+    stream failed part way and the answer is truncated or a fallback message.
+    """
+    if not context_chunks:
+        yield NO_CONTEXT_MESSAGE
+        return True
+        
+    messages = build_answer_messages(question, context_chunks)
+    cache_key = make_cache_key(CHAT_MODEL, None, messages)
+    cached_answer = get_cached_completion(cache_key)
+    if cached_answer is not None:
+        yield cached_answer
+        return True
+    
+    parts = []
+    try:
+        stream = client.chat.completions.create(
+            model=CHAT_MODEL,
+            messages=messages,
+            max_tokens=1000,
+            stream=True,
+            timeout=45
+        )
+        
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                parts.append(chunk.choices[0].delta.content)
+                yield chunk.choices[0].delta.content
+    except Exception as e:
+        print(f"Error streaming answer: {e}")
+        # A partial answer is kept; only a stream that produced nothing is replaced
+        if not parts:
+            yield ANSWER_FAILED_MESSAGE
+        return False
+        
+    # Only complete streams are cached
+    store_completion(cache_key, "".join(parts))
+    return True
 
 def generate_diagram(question, context_chunks, diagram_type="flowchart"):
     """Generate a Mermaid diagram based on context."""
@@ -425,14 +1147,17 @@ def generate_diagram(question, context_chunks, diagram_type="flowchart"):
             return False, "I don't have enough information to generate a diagram. Please upload relevant documents."
             
         # Prepare context
-        context = "\n\n".join([chunk["content"] for chunk in context_chunks])
+        context = build_context(context_chunks)
         print(f"Prepared context with {len(context)} characters")
         
-        # Construct the prompt
+        # Construct the prompt; the diagram and its explanation come back together
+        # in one JSON response instead of two sequential round-trips
         messages = [
             {"role": "system", "content": f"You are an AI assistant specialized in creating {diagram_type} diagrams using Mermaid syntax. "
                                          "Create a diagram based ONLY on the provided context. "
-                                         "Return ONLY the Mermaid code without any explanation or markdown formatting."},
+                                         "Respond in JSON with two fields: 'mermaid' containing ONLY the Mermaid code "
+                                         "without markdown formatting, and 'explanation' containing a clear, concise "
+                                         "explanation of the diagram in simple terms."},
             {"role": "user", "content": f"Context information: {context}\n\nCreate a {diagram_type} diagram for: {question}"}
         ]
         
@@ -447,7 +1172,8 @@ def generate_diagram(question, context_chunks, diagram_type="flowchart"):
                 response = client.chat.completions.create(
                     model="gpt-4o", # the newest OpenAI model is "gpt-4o" which was released May 13, 2024.
                     messages=messages,
-                    max_tokens=1000,
+                    response_format={"type": "json_object"},
+                    max_tokens=1500,
                     timeout=45  # 45 second timeout
                 )
                 break  # If successful, break out of retry loop
@@ -463,7 +1189,11 @@ def generate_diagram(question, context_chunks, diagram_type="flowchart"):
             print("All retries failed for diagram generation")
             return False, "Failed to generate diagram after multiple attempts due to API rate limits. Please try again later."
         
-        mermaid_code = response.choices[0].message.content.strip()
+        result = json.loads(response.choices[0].message.content)
+        mermaid_code = str(result.get("mermaid", "")).strip()
+        explanation = result.get("explanation") or "Explanation could not be generated."
+        if not mermaid_code:
+            return False, "Could not generate a diagram from the document content."
         print(f"Received mermaid code: {mermaid_code[:100]}...")
         
         # Clean up the response to extract just the Mermaid code
@@ -487,46 +1217,6 @@ def generate_diagram(question, context_chunks, diagram_type="flowchart"):
         elif diagram_type == "mindmap" and not mermaid_code.strip().startswith("mindmap"):
             mermaid_code = "mindmap\n" + mermaid_code
         
-        print("Clean mermaid code extracted, generating explanation...")
-        
-        # Generate explanation with retry mechanism
-        max_retries = 3
-        retry_delay = 1.0
-        
-        # Generate explanation
-        explanation_messages = [
-            {"role": "system", "content": "You are an AI assistant specialized in explaining diagrams. "
-                                         "Provide a clear, concise explanation of the diagram."},
-            {"role": "user", "content": f"Diagram: {mermaid_code}\n\nExplain this diagram in simple terms."}
-        ]
-        
-        for attempt in range(max_retries):
-            try:
-                explanation_response = client.chat.completions.create(
-                    model="gpt-4o", # the newest OpenAI model is "gpt-4o" which was released May 13, 2024.
-                    messages=explanation_messages,
-                    max_tokens=500,
-                    timeout=45  # 45 second timeout
-                )
-                break  # If successful, break out of retry loop
-            except Exception as e:
-                if "rate_limit_exceeded" in str(e) and attempt < max_retries - 1:
-                    print(f"Rate limit exceeded for explanation, retrying in {retry_delay} seconds...")
-                    time.sleep(retry_delay)
-                    retry_delay *= 2  # Exponential backoff
-                else:
-                    raise
-        else:
-            # If we exit the loop normally (all retries failed)
-            print("All retries failed for explanation generation")
-            # Still return the diagram even if explanation fails
-            explanation = "Explanation could not be generated due to API limitations."
-            save_diagram(mermaid_code, explanation, diagram_type)
-            return True, (mermaid_code, explanation)
-        
-        explanation = explanation_response.choices[0].message.content
-        print("Explanation generated successfully, saving diagram...")
-        
         # Save diagram
         save_diagram(mermaid_code, explanation, diagram_type)
         print("Diagram saved successfully")
@@ -536,21 +1226,23 @@ def generate_diagram(question, context_chunks, diagram_type="flowchart"):
         print(f"Error generating diagram: {str(e)}")
         return False, f"Sorry, I encountered an error while generating a diagram: {str(e)}"
 
+# Keyword scans for diagram requests, compiled once into single-pass alternations
+DIAGRAM_KEYWORDS = ["diagram", "flowchart", "chart", "graph", "visualization", "visualize", "map", "mapping", "sequence", "process flow"]
+DIAGRAM_REQUEST_RE = re.compile("|".join(map(re.escape, DIAGRAM_KEYWORDS)), re.IGNORECASE)
+SEQUENCE_DIAGRAM_RE = re.compile("sequence|step", re.IGNORECASE)
+MINDMAP_DIAGRAM_RE = re.compile("mind map|concept map", re.IGNORECASE)
+
 def detect_diagram_request(question):
     """Detect if question is requesting a diagram."""
     try:
-        diagram_keywords = ["diagram", "flowchart", "chart", "graph", "visualization", "visualize", "map", "mapping", "sequence", "process flow"]
-        question_lower = question.lower()
-        
-        for keyword in diagram_keywords:
-            if keyword in question_lower:
-                # Determine diagram type
-                if "sequence" in question_lower or "step" in question_lower:
-                    return True, "sequence"
-                elif "mind map" in question_lower or "concept map" in question_lower:
-                    return True, "mindmap"
-                else:
-                    return True, "flowchart"
+        if DIAGRAM_REQUEST_RE.search(question):
+            # Determine diagram type
+            if SEQUENCE_DIAGRAM_RE.search(question):
+                return True, "sequence"
+            elif MINDMAP_DIAGRAM_RE.search(question):
+                return True, "mindmap"
+            else:
+                return True, "flowchart"
                     
         return False, None
     except Exception as e:
@@ -558,44 +1250,82 @@ def detect_diagram_request(question):
         return False, None
 
 # Chat history and diagrams
-def save_chat_history(question, answer):
+# Chat history grows without bound, so it lives in SQLite rather than data.json:
+# appending a message no longer rewrites every session, and a page load only
+# reads the current session's rows
+CHAT_DB_PATH = "data_storage/chat_history.db"
+chat_db = None
+chat_db_lock = threading.Lock()
+
+def get_chat_db():
+    """Open the chat history database on first use (call with chat_db_lock held)."""
+    global chat_db
+    if chat_db is None:
+        connection = sqlite3.connect(CHAT_DB_PATH, check_same_thread=False)
+        with connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS chat_history ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, session_id TEXT NOT NULL, "
+                "question TEXT NOT NULL, answer TEXT NOT NULL)"
+            )
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS chat_history_session ON chat_history (session_id, id)"
+            )
+            
+            # Move history from older data.json files into the database
+            for session_id, session_data in list(storage["sessions"].items()):
+                with get_session_lock(session_id):
+                    history = session_data.pop("chat_history", None)
+                if history:
+                    connection.executemany(
+                        "INSERT INTO chat_history (session_id, question, answer) VALUES (?, ?, ?)",
+                        [(session_id, question, answer) for question, answer in history]
+                    )
+        storage.save()
+        chat_db = connection
+    return chat_db
+
+def save_chat_history(question, answer, session_id=None):
     """Save chat history to storage with timestamp."""
-    session_id = get_current_session()
+    if session_id is None:
+        session_id = get_current_session()
     timestamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime())
     
     try:
-        if "sessions" not in storage:
-            storage["sessions"] = {}
-            
-        if session_id not in storage["sessions"]:
-            storage["sessions"][session_id] = {
-                "created_at": time.time(),
-                "documents": {},
-                "chat_history": [],
-                "diagrams": []
-            }
-        
         # Add timestamp to the question and answer
         timestamped_question = f"[{timestamp}] {question}"
         timestamped_answer = f"[{timestamp}] {answer}"
         
-        storage["sessions"][session_id]["chat_history"].append((timestamped_question, timestamped_answer))
+        with chat_db_lock:
+            connection = get_chat_db()
+            with connection:
+                connection.execute(
+                    "INSERT INTO chat_history (session_id, question, answer) VALUES (?, ?, ?)",
+                    (session_id, timestamped_question, timestamped_answer)
+                )
         print(f"Saved chat history with timestamp: {timestamp}")
         return True
     except Exception as e:
         print(f"Error saving chat history: {e}")
         return False
 
-def get_chat_history(session_id=None):
-    """Get chat history for a session."""
+# The home page shows only the most recent exchanges of a session
+CHAT_HISTORY_LIMIT = 50
+
+def get_chat_history(session_id=None, limit=CHAT_HISTORY_LIMIT):
+    """Get a session's most recent (question, answer) pairs, oldest first."""
     if session_id is None:
         session_id = get_current_session()
         
     try:
-        if "sessions" not in storage or session_id not in storage["sessions"]:
-            return []
-            
-        return storage["sessions"][session_id]["chat_history"]
+        with chat_db_lock:
+            # The (session_id, id) index serves the newest rows without scanning the rest
+            rows = get_chat_db().execute(
+                "SELECT question, answer FROM chat_history WHERE session_id = ? ORDER BY id DESC LIMIT ?",
+                (session_id, limit)
+            ).fetchall()
+        rows.reverse()
+        return rows
     except Exception as e:
         print(f"Error getting chat history: {e}")
         return []
@@ -605,18 +1335,11 @@ def save_diagram(diagram_code, explanation, diagram_type):
     session_id = get_current_session()
     
     try:
-        if "sessions" not in storage:
-            storage["sessions"] = {}
-            
-        if session_id not in storage["sessions"]:
-            storage["sessions"][session_id] = {
-                "created_at": time.time(),
-                "documents": {},
-                "chat_history": [],
-                "diagrams": []
-            }
-            
-        storage["sessions"][session_id]["diagrams"].append((diagram_code, explanation, diagram_type))
+        session_data = get_session_data(session_id)
+        
+        with get_session_lock(session_id):
+            session_data["diagrams"].append((diagram_code, explanation, diagram_type))
+        storage.save()
         return True
     except Exception as e:
         print(f"Error saving diagram: {e}")
@@ -637,22 +1360,43 @@ def get_diagrams(session_id=None):
         return []
 
 # Session management
-def list_all_sessions():
-    """List all available sessions."""
+# The sessions panel lists only the most recently created sessions
+SESSION_LIST_LIMIT = 20
+
+def list_all_sessions(limit=SESSION_LIST_LIMIT):
+    """List the most recently created sessions, newest first."""
     try:
         if "sessions" not in storage:
             return {}
             
-        sessions = {}
-        for session_id, session_data in storage["sessions"].items():
-            sessions[session_id] = session_data["created_at"]
-            
-        return sessions
+        # Copy the items so sessions created meanwhile don't break iteration
+        created = [(session_id, session_data["created_at"]) for session_id, session_data in list(storage["sessions"].items())]
+        return dict(heapq.nlargest(limit, created, key=lambda item: item[1]))
     except Exception as e:
         print(f"Error listing sessions: {e}")
         return {}
 
 # Logging and status tracking functions
+# Statuses are only polled while a question is answered, so old ones are dropped
+QUESTION_STATUS_TTL_SECONDS = 600
+QUESTION_STATUS_MAX_ENTRIES = 10000
+question_status_created = OrderedDict()  # question_id -> creation time, oldest first
+question_status_lock = threading.Lock()  # Guards adding and expiring statuses
+
+def prune_question_statuses():
+    """Forget expired question statuses and make room for a new one (call with the lock held).
+    
+    Statuses older than QUESTION_STATUS_TTL_SECONDS are dropped, and the oldest
+    go first whenever a burst would exceed QUESTION_STATUS_MAX_ENTRIES.
+    """
+    cutoff = time.time() - QUESTION_STATUS_TTL_SECONDS
+    while question_status_created:
+        question_id, created = next(iter(question_status_created.items()))
+        if created > cutoff and len(question_status_created) < QUESTION_STATUS_MAX_ENTRIES:
+            break
+        question_status_created.popitem(last=False)
+        process_log_storage["question_status"].pop(question_id, None)
+
 def log_message(message):
     """Add a message to the logs with timestamp."""
     timestamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime())
@@ -662,266 +1406,147 @@ def log_message(message):
     })
     print(message)  # Also print to console
 
-def update_question_status(question_id, stage=None, progress=None, done=None, error=None):
-    """Update the status of a question being processed."""
-    if question_id not in process_log_storage["question_status"]:
-        # Initialize with default values
-        process_log_storage["question_status"][question_id] = {
-            "start_time": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime()),
-            "stage": "Starting",
-            "progress": 5,
-            "done": False,
-            "error": None
-        }
+# Each status is read and updated under its shard's lock, so readers get
+# consistent snapshots without serializing every question on one lock
+QUESTION_STATUS_LOCK_SHARDS = 16
+question_status_locks = [threading.Lock() for _ in range(QUESTION_STATUS_LOCK_SHARDS)]
+
+def get_question_status_lock(question_id):
+    """Get the lock guarding a question's status."""
+    return question_status_locks[hash(question_id) % QUESTION_STATUS_LOCK_SHARDS]
+
+def get_question_status_snapshot(question_id):
+    """Get a consistent copy of a question's status, or None if it is unknown."""
+    with get_question_status_lock(question_id):
+        status = process_log_storage["question_status"].get(question_id)
+        return dict(status) if status is not None else None
+
+def update_question_status(question_id, stage=None, progress=None, done=None, error=None, answer=None, has_diagram=None, diagram_code=None):
+    """Update the status of a question being processed and return a snapshot of it."""
+    if not question_id:
+        return None
+        
+    with get_question_status_lock(question_id):
+        status = process_log_storage["question_status"].get(question_id)
+        if status is None:
+            # Initialize with default values
+            status = {
+                "start_time": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime()),
+                "stage": "Starting",
+                "progress": 5,
+                "done": False,
+                "error": None
+            }
+            with question_status_lock:
+                prune_question_statuses()
+                question_status_created[question_id] = time.time()
+                process_log_storage["question_status"][question_id] = status
+        
+        # Apply all provided fields in one update
+        delta = {}
+        if stage:
+            delta["stage"] = stage
+        if progress is not None:
+            delta["progress"] = progress
+        if done is not None:
+            delta["done"] = done
+        if error:
+            delta["error"] = error
+        if answer is not None:
+            delta["answer"] = answer
+        if has_diagram is not None:
+            delta["has_diagram"] = has_diagram
+        if diagram_code:
+            delta["diagram_code"] = diagram_code
+        
+        # Repeated updates aren't applied or logged again
+        changed = any(status.get(key) != value for key, value in delta.items())
+        if changed:
+            status.update(delta)
+        
+        snapshot = dict(status)
+    
+    if not changed:
+        return snapshot
     
-    # Update provided fields
+    # Logged outside the lock; printing can be slow
     if stage:
-        process_log_storage["question_status"][question_id]["stage"] = stage
         log_message(f"Question {question_id}: {stage}")
-    
-    if progress is not None:
-        process_log_storage["question_status"][question_id]["progress"] = progress
-    
-    if done is not None:
-        process_log_storage["question_status"][question_id]["done"] = done
-        if done:
-            log_message(f"Question {question_id}: Processing complete")
-    
+    if done:
+        log_message(f"Question {question_id}: Processing complete")
     if error:
-        process_log_storage["question_status"][question_id]["error"] = error
         log_message(f"Question {question_id} ERROR: {error}")
     
-    return process_log_storage["question_status"][question_id]
+    return snapshot
 
-# Flask routes
-@app.route('/')
-def index():
-    """Render the main application page."""
-    session_id = get_current_session()
-    sessions = list_all_sessions()
-    chat_history = get_chat_history()
-    diagrams = get_diagrams()
-    documents = get_document_chunks()
+# Static assets are linked with a hash of their contents, so browsers can keep
+# them for a year and still pick up changes on the next deploy
+STATIC_ASSET_MAX_AGE = 365 * 24 * 60 * 60
+
+@functools.lru_cache(maxsize=None)
+def static_asset_version(filename):
+    """Hash a static file's contents for use as a cache-busting URL parameter."""
+    with open(os.path.join(app.static_folder, filename), 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()[:12]
+
+def cache_versioned_static(response):
+    """Mark content-hashed static responses as cacheable for a year."""
+    if request.path.startswith("/static/") and request.args.get("v"):
+        response.cache_control.no_cache = None
+        response.cache_control.public = True
+        response.cache_control.max_age = STATIC_ASSET_MAX_AGE
+        response.cache_control.immutable = True
+    return response
+
+def conditional_page(html):
+    """Wrap a rendered page in a response that browsers revalidate by ETag.
     
-    # Reset any error status in the current session
-    update_question_status(None, stage=None, progress=None, done=None, error=None)
+    Reloading an unchanged page then gets an empty 304 instead of the full body.
+    """
+    response = make_response(html)
+    response.add_etag()
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+def conditional_status(status):
+    """Respond to a status poll, or send an empty 304 if the status hasn't moved.
     
-    return render_template_string("""
+    The weak ETag is built from the fields that change while a question is
+    answered, so repeated polls at the same stage skip JSON serialization.
+    """
+    etag = "{}-{}-{:d}-{:d}-{:d}".format(
+        status.get("stage", ""), status.get("progress", 0), bool(status.get("done")),
+        status.get("error") is not None, status.get("answer") is not None)
+    if request.if_none_match.contains_weak(etag):
+        response = make_response("", 304)
+    else:
+        response = jsonify(status)
+    response.set_etag(etag, weak=True)
+    response.cache_control.no_cache = True
+    return response
+
+app.jinja_env.globals["static_asset_version"] = static_asset_version
+app.after_request(cache_versioned_static)
+
+def minify_template(html):
+    """Drop indentation and blank lines from template source.
+    
+    Line breaks are kept, so inline scripts parse exactly as before.
+    """
+    return "\n".join(line.strip() for line in html.splitlines() if line.strip())
+
+# The home page is minified and compiled once at import instead of on every request
+INDEX_HTML = """
     <!DOCTYPE html>
     <html lang="en">
     <head>
         <meta charset="UTF-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <title>RegCap GPT | Regulatory Intelligence</title>
-        <link href="https://cdn.jsdelivr.net/npm/bootstrap@5.3.0-alpha1/dist/css/bootstrap.min.css" rel="stylesheet">
-        <link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/4.7.0/css/font-awesome.min.css">
-        <link rel="stylesheet" href="https://cdn.jsdelivr.net/npm/mermaid/dist/mermaid.min.css">
-        <style>
-            :root {
-                --bg-color: #ffffff;
-                --text-color: #212529;
-                --border-color: #ddd;
-                --tab-bg: #f5f5f5;
-                --tab-active-bg: #007bff;
-                --tab-active-color: white;
-                --user-msg-bg: #e6f7ff;
-                --user-msg-border: #1890ff;
-                --bot-msg-bg: #f5f5f5;
-                --bot-msg-border: #52c41a;
-                --session-bg: #f8f9fa;
-                --diagram-bg: #e9f7ef;
-                --app-heading: #0056b3;
-                --card-bg: #f8f9fa;
-                --notification-bg: #ffe8cc;
-                --notification-text: #333;
-            }
-            
-            [data-theme="dark"] {
-                --bg-color: #212529;
-                --text-color: #f8f9fa;
-                --border-color: #495057;
-                --tab-bg: #343a40;
-                --tab-active-bg: #0d6efd;
-                --tab-active-color: white;
-                --user-msg-bg: #0d47a1;
-                --user-msg-border: #42a5f5;
-                --bot-msg-bg: #2d2d2d;
-                --bot-msg-border: #66bb6a;
-                --session-bg: #343a40;
-                --diagram-bg: #343a40;
-                --app-heading: #42a5f5;
-                --card-bg: #343a40;
-                --notification-bg: #664500;
-                --notification-text: #ffe8cc;
-            }
-            
-            body {
-                font-family: Arial, sans-serif;
-                line-height: 1.6;
-                padding: 20px;
-                max-width: 1200px;
-                margin: 0 auto;
-                background-color: var(--bg-color);
-                color: var(--text-color);
-                transition: all 0.3s ease;
-            }
-            .chat-container {
-                height: 400px;
-                overflow-y: auto;
-                padding: 15px 0;
-                margin-bottom: 20px;
-            }
-            .user-message, .bot-message {
-                margin-bottom: 15px;
-                padding: 10px;
-                border-radius: 5px;
-                box-shadow: 0 1px 3px rgba(0,0,0,0.12);
-            }
-            .user-message {
-                background-color: var(--user-msg-bg);
-                margin-left: 20%;
-                border-left: 3px solid var(--user-msg-border);
-            }
-            .bot-message {
-                background-color: var(--bot-msg-bg);
-                margin-right: 20%;
-                border-left: 3px solid var(--bot-msg-border);
-            }
-            .document-section, .diagram-section {
-                margin-top: 30px;
-                padding: 20px;
-                border: 1px solid var(--border-color);
-                border-radius: 5px;
-                background-color: var(--card-bg);
-                color: var(--text-color);
-            }
-            .app-container {
-                display: flex;
-                min-height: 80vh;
-            }
-            .tabs {
-                display: flex;
-                flex-direction: column;
-                width: 200px;
-                border-right: 1px solid var(--border-color);
-                margin-right: 20px;
-                padding-right: 10px;
-            }
-            .tab {
-                padding: 15px;
-                cursor: pointer;
-                background-color: var(--tab-bg);
-                border: 1px solid var(--border-color);
-                margin-bottom: 5px;
-                border-radius: 5px;
-                font-weight: bold;
-                transition: all 0.3s ease;
-                text-align: left;
-            }
-            .tab.active {
-                background-color: var(--tab-active-bg);
-                color: var(--tab-active-color);
-                border-color: var(--tab-active-bg);
-            }
-            .tab:hover {
-                background-color: #e3e3e3;
-            }
-            .tab.active:hover {
-                background-color: #0069d9;
-            }
-            [data-theme="dark"] .tab:hover {
-                background-color: #4a4a4a;
-            }
-            [data-theme="dark"] .tab.active:hover {
-                background-color: #0069d9;
-            }
-            #diagrams-tab-button {
-                background-color: var(--tab-bg);
-                border: 1px solid var(--border-color);
-            }
-            #diagrams-tab-button.active {
-                background-color: var(--tab-active-bg);
-                color: var(--tab-active-color);
-                border-color: var(--tab-active-bg);
-            }
-            [data-theme="dark"] #diagrams-tab-button {
-                background-color: var(--tab-bg);
-                border: 1px solid var(--border-color);
-            }
-            [data-theme="dark"] #diagrams-tab-button.active {
-                background-color: #0069d9;
-                color: white;
-                border-color: #0069d9;
-            }
-            .tab-content {
-                display: none;
-            }
-            .tab-content.active {
-                display: block;
-            }
-            .session-info {
-                margin-bottom: 20px;
-                padding: 10px;
-                background-color: var(--session-bg);
-                border-radius: 5px;
-                border: 1px solid var(--border-color);
-            }
-            .document-list {
-                margin-top: 15px;
-            }
-            .document-item {
-                padding: 5px 0;
-            }
-            .diagram-item {
-                margin-bottom: 30px;
-                padding: 15px;
-                border: 1px solid var(--border-color);
-                border-radius: 5px;
-                background-color: var(--card-bg);
-                color: var(--text-color);
-            }
-            .diagram-code {
-                margin-top: 10px;
-                padding: 10px;
-                background-color: var(--session-bg);
-                border-radius: 5px;
-                overflow-x: auto;
-            }
-            .diagram-explanation {
-                margin-top: 10px;
-                padding: 10px;
-                background-color: var(--card-bg);
-                color: var(--text-color);
-                border-radius: 5px;
-            }
-            .diagram-visual {
-                margin-top: 20px;
-                padding: 10px;
-                background-color: var(--diagram-bg);
-                color: var(--text-color);
-                border: 1px solid var(--border-color);
-                border-radius: 5px;
-            }
-            .footer {
-                margin-top: 50px;
-                text-align: center;
-                color: var(--text-color);
-                font-size: 0.9rem;
-                opacity: 0.7;
-            }
-            
-            /* Dark mode specific bootstrap overrides */
-            [data-theme="dark"] .form-control {
-                background-color: #333;
-                border-color: #555;
-                color: #fff;
-            }
-            [data-theme="dark"] .list-group-item {
-                background-color: #333;
-                border-color: #555;
-                color: #fff;
-            }
-        </style>
+        <meta name="viewport" content="width=device-width, initial-scale=1.0">
+        <title>RegCap GPT | Regulatory Intelligence</title>
+        <link href="https://cdn.jsdelivr.net/npm/bootstrap@5.3.0-alpha1/dist/css/bootstrap.min.css" rel="stylesheet">
+        <link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/4.7.0/css/font-awesome.min.css">
+        <link rel="stylesheet" href="https://cdn.jsdelivr.net/npm/mermaid/dist/mermaid.min.css">
+        <link rel="stylesheet" href="{{ url_for('static', filename='flask_app.css', v=static_asset_version('flask_app.css')) }}">
     </head>
     <body>
         <div class="container">
@@ -1001,6 +1626,7 @@ def index():
                         </div>
                         <button type="submit" class="btn btn-primary">Upload</button>
                     </form>
+                    <div id="upload-status" class="mt-2"></div>
                     
                     <div class="document-list mt-4">
                         <h4>Uploaded Documents</h4>
@@ -1087,451 +1713,69 @@ def index():
         
         <script src="https://cdn.jsdelivr.net/npm/bootstrap@5.3.0-alpha1/dist/js/bootstrap.bundle.min.js"></script>
         <script src="https://cdn.jsdelivr.net/npm/mermaid/dist/mermaid.min.js"></script>
-        <script>
-            // Initialize Mermaid with more robust configuration
-            mermaid.initialize({
-                startOnLoad: true,
-                theme: 'default',
-                logLevel: 'fatal',
-                securityLevel: 'loose',
-                flowchart: { 
-                    htmlLabels: true,
-                    curve: 'basis'
-                },
-                sequence: {
-                    diagramMarginX: 50,
-                    diagramMarginY: 10,
-                    actorMargin: 50,
-                    width: 150,
-                    height: 65
-                }
-            });
-            
-            // Wait for DOM to be fully loaded before setting up tab navigation
-            document.addEventListener('DOMContentLoaded', function() {
-                console.log('Setting up tab navigation');
-                
-                // Tab switching with data-tab attributes
-                const tabButtons = document.querySelectorAll('.tab');
-                tabButtons.forEach(button => {
-                    button.addEventListener('click', function() {
-                        const tabId = this.getAttribute('data-tab');
-                        console.log('Switching to tab:', tabId);
-                        
-                        // Hide all tab contents
-                        document.querySelectorAll('.tab-content').forEach(content => {
-                            content.classList.remove('active');
-                        });
-                        
-                        // Remove active class from buttons
-                        tabButtons.forEach(btn => {
-                            btn.classList.remove('active');
-                        });
-                        
-                        // Show selected tab
-                        document.getElementById(tabId).classList.add('active');
-                        this.classList.add('active');
-                        
-                        // Special handling for diagrams tab
-                        if (tabId === 'diagrams-tab') {
-                            const notification = document.getElementById('diagrams-notification');
-                            if (notification) {
-                                notification.style.display = 'none';
-                            }
-                            
-                            // Force re-render mermaid diagrams
-                            try {
-                                mermaid.init(undefined, '.mermaid');
-                            } catch(e) {
-                                console.error('Error re-rendering mermaid diagrams:', e);
-                            }
-                        }
-                    });
-                });
-            });
-            
-            // Scroll chat to bottom
-            function scrollChatToBottom() {
-                var chatContainer = document.getElementById('chat-messages');
-                chatContainer.scrollTop = chatContainer.scrollHeight;
-            }
-            
-            // Check if we have a diagram
-            function checkAndShowDiagramNotification() {
-                var mermaidDivs = document.querySelectorAll('.mermaid');
-                if (mermaidDivs.length > 0) {
-                    var notificationElement = document.getElementById('diagrams-notification');
-                    if (notificationElement) {
-                        notificationElement.style.display = 'block';
-                    }
-                    
-                    // Look for special alert in chat messages
-                    var botMessages = document.querySelectorAll('.bot-message');
-                    for(var i = 0; i < botMessages.length; i++) {
-                        if(botMessages[i].innerHTML.includes('Please click on the "Diagrams" tab above')) {
-                            // Check if button already exists to avoid duplicates
-                            if (!botMessages[i].querySelector('.btn-warning')) {
-                                // Add a click helper
-                                var helper = document.createElement('button');
-                                helper.innerHTML = 'View Diagram';
-                                helper.className = 'btn btn-warning mt-2';
-                                helper.onclick = function() {
-                                    document.getElementById('diagrams-tab-button').click();
-                                };
-                                botMessages[i].appendChild(helper);
-                            }
-                        }
-                    }
-                }
-            }
-            
-            // Function to ensure diagrams are properly rendered
-            function initMermaidDiagrams() {
-                try {
-                    // Clean up any previous mermaid initialization
-                    document.querySelectorAll('.mermaid svg').forEach(function(el) {
-                        el.remove();
-                    });
-                    
-                    // Reinitialize mermaid
-                    mermaid.init(undefined, '.mermaid');
-                } catch(e) {
-                    console.error("Error initializing mermaid diagrams:", e);
-                }
-            }
-            
-            // Dark mode toggle functionality
-            document.addEventListener('DOMContentLoaded', function() {
-                console.log('Setting up dark mode toggle');
-                
-                const darkModeToggle = document.getElementById('darkModeToggle');
-                if (!darkModeToggle) {
-                    console.error('Dark mode toggle button not found');
-                    return;
-                }
-                
-                const htmlElement = document.documentElement;
-                
-                // Check for saved theme preference or respect OS preference
-                const savedTheme = localStorage.getItem('theme');
-                const prefersDarkMode = window.matchMedia('(prefers-color-scheme: dark)').matches;
-                
-                // Apply dark theme if saved or OS prefers dark
-                if (savedTheme === 'dark' || (!savedTheme && prefersDarkMode)) {
-                    htmlElement.setAttribute('data-theme', 'dark');
-                    darkModeToggle.innerHTML = '<i class="fa fa-sun-o"></i> Light Mode';
-                    // Update Mermaid theme
-                    mermaid.initialize({ theme: 'dark' });
-                }
-                
-                // Toggle theme when button is clicked
-                darkModeToggle.addEventListener('click', function() {
-                    console.log('Dark mode toggle clicked');
-                    
-                    if (htmlElement.getAttribute('data-theme') === 'dark') {
-                        htmlElement.removeAttribute('data-theme');
-                        localStorage.setItem('theme', 'light');
-                        darkModeToggle.innerHTML = '<i class="fa fa-moon-o"></i> Dark Mode';
-                        // Update Mermaid theme
-                        mermaid.initialize({ theme: 'default' });
-                    } else {
-                        htmlElement.setAttribute('data-theme', 'dark');
-                        localStorage.setItem('theme', 'dark');
-                        darkModeToggle.innerHTML = '<i class="fa fa-sun-o"></i> Light Mode';
-                        // Update Mermaid theme
-                        mermaid.initialize({ theme: 'dark' });
-                    }
-                    
-                    // Reinitialize Mermaid diagrams with the new theme
-                    try {
-                        setTimeout(function() {
-                            initMermaidDiagrams();
-                        }, 100);
-                    } catch (error) {
-                        console.error("Error updating Mermaid diagrams after theme change:", error);
-                    }
-                });
-            });
-            
-            // Session management via AJAX
-            function setupSessionManagement() {
-                // Create new session
-                const createNewSessionBtn = document.getElementById('createNewSessionBtn');
-                if (createNewSessionBtn) {
-                    createNewSessionBtn.addEventListener('click', function() {
-                        // Display loading state
-                        createNewSessionBtn.disabled = true;
-                        createNewSessionBtn.innerHTML = 'Creating...';
-                        
-                        // Send AJAX request
-                        fetch('/new_session', {
-                            method: 'POST',
-                            headers: {
-                                'Content-Type': 'application/json',
-                            },
-                        })
-                        .then(response => {
-                            if (response.ok) {
-                                // Refresh only the content, not the entire page
-                                window.location.href = '/?t=' + new Date().getTime();
-                            }
-                        })
-                        .catch(error => {
-                            console.error('Error creating new session:', error);
-                            createNewSessionBtn.disabled = false;
-                            createNewSessionBtn.innerHTML = 'Create New Session';
-                        });
-                    });
-                }
-                
-                // Setup switch session buttons
-                const switchButtons = document.querySelectorAll('.switch-session-btn');
-                switchButtons.forEach(function(button) {
-                    button.addEventListener('click', function() {
-                        const sessionId = this.getAttribute('data-session-id');
-                        
-                        // Display loading state
-                        button.disabled = true;
-                        button.innerHTML = 'Switching...';
-                        
-                        // Create form data
-                        const formData = new FormData();
-                        formData.append('session_id', sessionId);
-                        
-                        // Send AJAX request
-                        fetch('/switch_session', {
-                            method: 'POST',
-                            body: formData
-                        })
-                        .then(response => {
-                            if (response.ok) {
-                                // Refresh only the content, not the entire page
-                                window.location.href = '/?t=' + new Date().getTime();
-                            }
-                        })
-                        .catch(error => {
-                            console.error('Error switching session:', error);
-                            button.disabled = false;
-                            button.innerHTML = 'Switch';
-                        });
-                    });
-                });
-            }
-            
-            // Setup AJAX form submission for questions
-            function setupQuestionFormAjax() {
-                const questionForm = document.getElementById('question-form');
-                const askButton = document.getElementById('ask-button');
-                const statusDiv = document.getElementById('question-status');
-                const questionInput = document.getElementById('question');
-                
-                if (questionForm) {
-                    questionForm.addEventListener('submit', function(e) {
-                        e.preventDefault(); // Prevent regular form submission
-                        
-                        const question = questionInput.value.trim();
-                        if (!question) return; // Don't submit empty questions
-                        
-                        // Show loading status and disable button
-                        askButton.disabled = true;
-                        statusDiv.style.display = 'block';
-                        
-                        // Create the form data from the question
-                        const formData = new FormData();
-                        formData.append('question', question);
-                        
-                        // Send AJAX request with x-requested-with header
-                        fetch('/ask', {
-                            method: 'POST',
-                            headers: {
-                                'X-Requested-With': 'XMLHttpRequest'
-                            },
-                            body: formData
-                        })
-                        .then(response => {
-                            if (response.ok) {
-                                return response.json().then(data => {
-                                    console.log('Question submitted:', data);
-                                    
-                                    // Add placeholder message to the chat
-                                    const chatMessages = document.getElementById('chat-messages');
-                                    const userMsg = document.createElement('div');
-                                    userMsg.className = 'message user-message';
-                                    userMsg.textContent = question;
-                                    chatMessages.appendChild(userMsg);
-                                    
-                                    const botMsg = document.createElement('div');
-                                    botMsg.className = 'message bot-message';
-                                    botMsg.innerHTML = '<div class="processing-message">Processing your question... <div class="spinner-border spinner-border-sm text-primary" role="status"><span class="visually-hidden">Loading...</span></div></div>';
-                                    chatMessages.appendChild(botMsg);
-                                    
-                                    // Set up status polling if we have a question ID
-                                    if (data.question_id) {
-                                        startStatusPolling(data.question_id, botMsg);
-                                    }
-                                    
-                                    scrollChatToBottom();
-                                    
-                                    // Clear input
-                                    questionInput.value = '';
-                                    
-                                    // Simply re-enable the button after a delay
-                                    setTimeout(function() {
-                                        askButton.disabled = false;
-                                        statusDiv.style.display = 'none';
-                                    }, 1500);
-                                    
-                                    // Add a small refresh button next to the "Processing" text in the chat
-                                    const processingMsgs = document.querySelectorAll('.processing-message');
-                                    processingMsgs.forEach(msg => {
-                                        // Only add refresh button if it doesn't already have one
-                                        if (!msg.querySelector('.refresh-btn')) {
-                                            const refreshBtn = document.createElement('button');
-                                            refreshBtn.className = 'btn btn-sm btn-outline-primary refresh-btn ms-2';
-                                            refreshBtn.innerHTML = '<i class="fa fa-refresh"></i>';
-                                            refreshBtn.title = "Check for answer";
-                                            refreshBtn.onclick = function() { window.location.reload(); };
-                                            msg.appendChild(refreshBtn);
-                                        }
-                                    });
-                            } else {
-                                console.error('Failed to submit question');
-                                statusDiv.textContent = 'Error submitting question. Please try again.';
-                                askButton.disabled = false;
-                            }
-                        })
-                        .catch(error => {
-                            console.error('Error submitting question:', error);
-                            statusDiv.textContent = 'Error: ' + error.message;
-                            askButton.disabled = false;
-                        });
-                    });
-                }
-            }
-            
-            // Function to poll for status updates
-            function startStatusPolling(questionId, botMsg) {
-                console.log('Starting status polling for question:', questionId);
-                
-                // Add status indicator to the bot message
-                const statusDiv = document.createElement('div');
-                statusDiv.className = 'status-indicator mt-2';
-                statusDiv.innerHTML = `
-                    <div class="card p-2 bg-light">
-                        <div class="d-flex justify-content-between align-items-center">
-                            <span class="status-text small">Initializing...</span>
-                            <span class="status-percentage badge bg-primary">5%</span>
-                        </div>
-                        <div class="progress mt-1" style="height: 4px;">
-                            <div class="progress-bar progress-bar-striped progress-bar-animated" 
-                                 role="progressbar" style="width: 5%;" 
-                                 aria-valuenow="5" aria-valuemin="0" aria-valuemax="100"></div>
-                        </div>
-                    </div>
-                `;
-                
-                botMsg.appendChild(statusDiv);
-                
-                const statusText = statusDiv.querySelector('.status-text');
-                const statusPercentage = statusDiv.querySelector('.status-percentage');
-                const progressBar = statusDiv.querySelector('.progress-bar');
-                
-                let pollCount = 0;
-                let lastStage = '';
-                
-                // Set up the polling interval
-                const pollInterval = setInterval(() => {
-                    pollCount++;
-                    
-                    // Check the status
-                    fetch(`/get_question_status/${questionId}`)
-                    .then(response => response.json())
-                    .then(status => {
-                        console.log('Question status:', status);
-                        
-                        // Update the UI with the status
-                        if (status.stage && status.stage !== lastStage) {
-                            statusText.innerText = status.stage;
-                            lastStage = status.stage;
-                        }
-                        
-                        if (status.progress !== undefined) {
-                            const progress = status.progress;
-                            statusPercentage.innerText = `${progress}%`;
-                            progressBar.style.width = `${progress}%`;
-                            progressBar.setAttribute('aria-valuenow', progress);
-                            
-                            // Update color based on progress
-                            if (progress > 75) {
-                                progressBar.className = 'progress-bar progress-bar-striped progress-bar-animated bg-success';
-                            } else if (progress > 50) {
-                                progressBar.className = 'progress-bar progress-bar-striped progress-bar-animated bg-info';
-                            }
-                        }
-                        
-                        // If the question is done processing or there's an error, stop polling
-                        if (status.done || status.error) {
-                            console.log('Question processing complete:', status);
-                            clearInterval(pollInterval);
-                            
-                            // Set final status display
-                            if (status.error) {
-                                statusDiv.querySelector('.card').className = 'card p-2 bg-danger-subtle';
-                                statusText.className = 'status-text small text-danger';
-                                statusText.innerText = status.error;
-                            } else {
-                                // If done successfully, hide the status after a few seconds
-                                setTimeout(() => {
-                                    statusDiv.style.display = 'none';
-                                }, 3000);
-                            }
-                            
-                            // Refresh the page to show the answer
-                            setTimeout(() => {
-                                window.location.reload();
-                            }, 1000);
-                        }
-                    })
-                    .catch(error => {
-                        console.error('Error polling status:', error);
-                        // Don't stop polling on error, just log it
-                    });
-                    
-                    // If we've been polling for a long time without completion,
-                    // still reload but at a slower interval (after 30 seconds)
-                    if (pollCount > 60) { // 30 seconds (if polling every 500ms)
-                        clearInterval(pollInterval);
-                        console.log('Polling timeout reached, refreshing page');
-                        setTimeout(() => {
-                            window.location.reload();
-                        }, 1000);
-                    }
-                }, 500); // Poll every 500ms
-            }
-            
-            // Call functions when page loads
-            window.onload = function() {
-                scrollChatToBottom();
-                
-                // Initialize diagrams with a delay to ensure DOM is fully loaded
-                setTimeout(initMermaidDiagrams, 300);
-                
-                // Show diagram notification
-                setTimeout(checkAndShowDiagramNotification, 500);
-                
-                // Setup dark mode toggle
-                setupDarkModeToggle();
-                
-                // Setup session management
-                setupSessionManagement();
-                
-                // Setup AJAX question form
-                setupQuestionFormAjax();
-            };
-        </script>
+        <script src="{{ url_for('static', filename='flask_app.js', v=static_asset_version('flask_app.js')) }}"></script>
     </body>
     </html>
-    """, session_id=session_id, sessions=sessions, chat_history=chat_history, diagrams=diagrams, documents=documents)
+    """
+INDEX_TEMPLATE = app.jinja_env.from_string(minify_template(INDEX_HTML))
+
+# Flask routes
+@app.route('/')
+def index():
+    """Render the main application page."""
+    session_id = get_current_session()
+    sessions = list_all_sessions()
+    chat_history = get_chat_history()
+    diagrams = get_diagrams()
+    documents = get_document_chunks()
+    
+    # Reset any error status in the current session
+    update_question_status(None, stage=None, progress=None, done=None, error=None)
+    
+    return conditional_page(render_template(INDEX_TEMPLATE, session_id=session_id, sessions=sessions, chat_history=chat_history, diagrams=diagrams, documents=documents))
+
+# Uploaded PDFs are ingested off the request thread; jobs are polled via /upload_status
+ingest_executor = ThreadPoolExecutor(max_workers=4)
+
+# Jobs are normally forgotten once a client polls their result, but a client
+# that navigates away never does, so old ones are dropped like question statuses
+UPLOAD_JOB_TTL_SECONDS = 3600
+UPLOAD_JOB_MAX_ENTRIES = 1000
+upload_jobs = OrderedDict()  # job_id -> (creation time, future), oldest first
+upload_jobs_lock = threading.Lock()
+
+def add_upload_job(future):
+    """Track a background upload job, forgetting expired ones, and return its ID."""
+    job_id = uuid.uuid4().hex
+    with upload_jobs_lock:
+        cutoff = time.time() - UPLOAD_JOB_TTL_SECONDS
+        while upload_jobs:
+            created, _ = next(iter(upload_jobs.values()))
+            if created > cutoff and len(upload_jobs) < UPLOAD_JOB_MAX_ENTRIES:
+                break
+            upload_jobs.popitem(last=False)
+        upload_jobs[job_id] = (time.time(), future)
+    return job_id
+
+def get_upload_job(job_id):
+    """Get an upload job's future, or None if it is unknown or expired."""
+    with upload_jobs_lock:
+        job = upload_jobs.get(job_id)
+    return job[1] if job is not None else None
+
+def forget_upload_job(job_id):
+    """Stop tracking an upload job whose result has been reported."""
+    with upload_jobs_lock:
+        upload_jobs.pop(job_id, None)
+
+def ingest_files(filenames, file_paths, session_id):
+    """Extract, store and embed uploaded PDFs in the background."""
+    for filename, text_chunks in zip(filenames, extract_text_from_pdfs(file_paths)):
+        save_document_chunks(filename, text_chunks, session_id)
+    
+    # Embed the chunks of every uploaded file together in batched requests
+    get_vector_store(session_id)
+    return filenames
 
 @app.route('/upload', methods=['POST'])
 def upload_files():
@@ -1540,6 +1784,8 @@ def upload_files():
         return redirect('/')
         
     files = request.files.getlist('document')
+    filenames = []
+    file_paths = []
     
     for file in files:
         if file.filename == '':
@@ -1547,48 +1793,61 @@ def upload_files():
             
         if file and file.filename.lower().endswith('.pdf'):
             filename = secure_filename(file.filename)
-            file_path = os.path.join("data_storage/uploads", filename)
+            file_path = os.path.join(UPLOADS_DIR, filename)
             file.save(file_path)
-            
-            # Process the PDF
-            text_chunks = extract_text_from_pdf(file_path)
-            save_document_chunks(filename, text_chunks)
+            filenames.append(filename)
+            file_paths.append(file_path)
+    
+    if not filenames:
+        return redirect('/')
     
-    return redirect('/')
+    # Hand the slow extraction and embedding work to the ingest pool
+    job_id = add_upload_job(ingest_executor.submit(ingest_files, filenames, file_paths, get_current_session()))
+    
+    return redirect(url_for('index', upload_job=job_id))
+
+@app.route('/upload_status/<job_id>', methods=['GET'])
+def get_upload_status(job_id):
+    """Get the status of a background upload job."""
+    future = get_upload_job(job_id)
+    if future is None:
+        return jsonify({"done": True, "success": False, "error": "Upload job not found"})
+    if not future.done():
+        return jsonify({"done": False})
+    
+    # Finished jobs are reported once and then forgotten
+    forget_upload_job(job_id)
+    try:
+        processed_files = future.result()
+    except Exception as e:
+        log_message(f"Error processing uploaded PDFs: {e}")
+        return jsonify({"done": True, "success": False, "error": f"Error processing PDFs: {e}"})
+    
+    return jsonify({"done": True, "success": True, "files": processed_files})
+
+# Questions are answered on a fixed pool of reused threads instead of one new
+# thread each; extra questions queue until a worker is free
+QUESTION_WORKERS = 16
+question_executor = ThreadPoolExecutor(max_workers=QUESTION_WORKERS, thread_name_prefix="question")
 
 @app.route('/ask', methods=['POST'])
 def ask_question():
     """Handle questions from the user."""
-    import threading
-    import time
-    import uuid
-    
     question = request.form.get('question', '')
     
     if not question:
-        if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
-            return jsonify({"error": "Question is required"}), 400
-        else:
-            return redirect('/')
+        return jsonify({"error": "Question is required"}), 400
     
     # Generate a unique ID for this question
-    question_id = str(uuid.uuid4())
+    question_id = uuid.uuid4().hex
     
     # Initialize question status
     update_question_status(question_id, stage="Initialized", progress=5)
     log_message(f"New question received: '{question[:50]}...' (ID: {question_id})")
     
-    # Save the question immediately to avoid losing it
-    answer = "<div class='processing-message'>Processing your question... <div class='spinner-border spinner-border-sm text-primary' role='status'><span class='visually-hidden'>Loading...</span></div></div>"
-    save_chat_history(question, answer)
-    
-    # If this is an AJAX request, return success immediately with the question ID
-    if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
-        return jsonify({
-            "success": True, 
-            "message": "Processing question in background",
-            "question_id": question_id
-        })
+    # The client shows its own processing message, so the question is only
+    # written to chat history once, with its answer
+    session_id = get_current_session()
     
     # Start processing in a separate thread
     def process_question():
@@ -1605,24 +1864,24 @@ def ask_question():
             
             # Get document chunks
             update_question_status(question_id, stage="Loading document chunks", progress=20)
-            chunks = get_all_document_chunks()
+            chunks = get_all_document_chunks(session_id)
             log_message(f"Question {question_id}: Found {len(chunks) if chunks else 0} document chunks")
             
             if not chunks:
                 answer = "Please upload documents first so I can answer your questions based on them."
-                update_chat_history(question, answer)
+                update_chat_history(answer)
                 update_question_status(question_id, stage="Failed - No documents", progress=100, done=True, 
                                      error="No document chunks found")
                 return
             
             # Create or get vector store
             update_question_status(question_id, stage="Creating vector store and computing embeddings", progress=30)
-            vector_store = create_vector_store(chunks)
+            vector_store = get_vector_store(session_id)
             log_message(f"Question {question_id}: Vector store created: {vector_store is not None}")
             
             if not vector_store:
                 answer = "There was an error processing your documents. Please try again."
-                update_chat_history(question, answer)
+                update_chat_history(answer)
                 update_question_status(question_id, stage="Failed - Vector store error", progress=100, done=True,
                                      error="Error creating vector store")
                 return
@@ -1680,14 +1939,18 @@ def ask_question():
                 
                 # Track the start time to measure how long the API call takes
                 start_time = time.time()
-                answer = generate_answer(question, similar_chunks)
+                answer = get_cached_answer(question, session_id)
+                if answer is None:
+                    answer = generate_answer(question, similar_chunks)
+                    if similar_chunks and answer != ANSWER_FAILED_MESSAGE:
+                        cache_answer(question, answer, session_id)
                 elapsed_time = time.time() - start_time
                 
                 log_message(f"Question {question_id}: Answer generated in {elapsed_time:.2f} seconds")
                 update_question_status(question_id, stage="Complete - Answer generated", progress=100, done=True)
             
             # Update the chat history with the actual answer
-            update_chat_history(question, answer)
+            update_chat_history(answer)
             
         except Exception as e:
             # Handle any unexpected errors
@@ -1697,30 +1960,74 @@ def ask_question():
                                  done=True, error=error_message)
             
             answer = f"I encountered an error while processing your question. Please try again or try asking a different question."
-            update_chat_history(question, answer)
+            update_chat_history(answer)
     
     # Helper function to update chat history
-    def update_chat_history(question, answer):
-        # Get the existing history
-        history = get_chat_history()
+    def update_chat_history(answer):
+        save_chat_history(question, answer, session_id)
         
-        if history:
-            # Remove the last entry (our placeholder)
-            history.pop()
-            
-            # Update storage with the modified history
-            session_id = get_current_session()
-            if "sessions" in storage and session_id in storage["sessions"]:
-                storage["sessions"][session_id]["chat_history"] = history
-            
-            # Add the new entry with the actual answer
-            save_chat_history(question, answer)
+        # Let the polling client show the answer without reloading the page
+        update_question_status(question_id, answer=answer)
+    
+    # Process the question in the background
+    question_executor.submit(process_question)
     
-    # Start processing thread
-    threading.Thread(target=process_question).start()
+    # Return immediately with the question ID; the client polls for the answer
+    return jsonify({
+        "success": True, 
+        "message": "Processing question in background",
+        "question_id": question_id
+    })
+
+@app.route('/ask_stream', methods=['GET'])
+def ask_stream():
+    """Stream the answer to a question as Server-Sent Events."""
+    question = request.args.get('question', '')
+    
+    if not question:
+        return jsonify({"error": "Question is required"}), 400
+    
+    session_id = get_current_session()
+    
+    def generate():
+        # Diagrams are rendered from a complete response, so the client falls back to /ask
+        is_diagram_request, _ = detect_diagram_request(question)
+        if is_diagram_request:
+            yield "event: diagram\ndata: {}\n\n"
+            return
+        
+        answer = get_cached_answer(question, session_id)
+        if answer is not None:
+            yield f"data: {json.dumps(answer)}\n\n"
+        else:
+            vector_store = get_vector_store(session_id)
+            similar_chunks = get_similar_chunks(question, vector_store) if vector_store else []
+            
+            parts = []
+            answer_stream = generate_answer_stream(question, similar_chunks)
+            while True:
+                try:
+                    delta = next(answer_stream)
+                except StopIteration as finished:
+                    complete = finished.value
+                    break
+                parts.append(delta)
+                yield f"data: {json.dumps(delta)}\n\n"
+            answer = "".join(parts)
+            
+            # A truncated answer would be served for similar questions, so only full ones are cached
+            if similar_chunks and complete:
+                cache_answer(question, answer, session_id)
+        
+        save_chat_history(question, answer, session_id)
+        log_message(f"Streamed answer for question: '{question[:50]}...'")
+        yield "event: done\ndata: {}\n\n"
     
-    # Return immediately to avoid blocking the user
-    return redirect('/')
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 @app.route('/new_session', methods=['POST'])
 def new_session():
@@ -1747,25 +2054,8 @@ def switch_session():
     else:
         return redirect('/')
 
-@app.route('/view_diagram/<int:diagram_index>')
-def view_diagram(diagram_index):
-    """Show a single diagram on a dedicated page."""
-    diagrams = get_diagrams()
-    
-    if diagram_index >= len(diagrams):
-        return "Diagram not found", 404
-        
-    diagram_code, explanation, diagram_type = diagrams[diagram_index]
-    
-    # Sanitize the mermaid code to ensure consistent syntax
-    if diagram_type == "flowchart":
-        # Fix mixed flowchart TD and graph TD syntax
-        if "flowchart TD" in diagram_code and "graph TD" in diagram_code:
-            diagram_code = diagram_code.replace("graph TD", "")
-        elif "graph TD" in diagram_code and not diagram_code.strip().startswith("graph TD"):
-            diagram_code = diagram_code.replace("graph TD;", "")
-    
-    return render_template_string("""
+# Standalone diagram page, compiled once at import
+DIAGRAM_HTML = """
     <!DOCTYPE html>
     <html lang="en">
     <head>
@@ -1982,19 +2272,43 @@ def view_diagram(diagram_index):
         </script>
     </body>
     </html>
-    """, diagram_code=diagram_code, explanation=explanation, diagram_type=diagram_type)
+    """
+DIAGRAM_TEMPLATE = app.jinja_env.from_string(DIAGRAM_HTML)
+
+@app.route('/view_diagram/<int:diagram_index>')
+def view_diagram(diagram_index):
+    """Show a single diagram on a dedicated page."""
+    diagrams = get_diagrams()
+    
+    if diagram_index >= len(diagrams):
+        return "Diagram not found", 404
+        
+    diagram_code, explanation, diagram_type = diagrams[diagram_index]
+    
+    # Sanitize the mermaid code to ensure consistent syntax
+    if diagram_type == "flowchart":
+        # Fix mixed flowchart TD and graph TD syntax
+        if "flowchart TD" in diagram_code and "graph TD" in diagram_code:
+            diagram_code = diagram_code.replace("graph TD", "")
+        elif "graph TD" in diagram_code and not diagram_code.strip().startswith("graph TD"):
+            diagram_code = diagram_code.replace("graph TD;", "")
+    
+    return render_template(DIAGRAM_TEMPLATE, diagram_code=diagram_code, explanation=explanation, diagram_type=diagram_type)
 
 # Logs storage
+# Only the most recent log lines are kept; /logs shows at most this many
+MAX_LOG_MESSAGES = 500
 process_log_storage = {
-    "logs": [],
+    "logs": deque(maxlen=MAX_LOG_MESSAGES),
     "question_status": {}
 }
 
 @app.route('/get_question_status/<question_id>', methods=['GET'])
 def get_question_status(question_id):
     """Get the status of a specific question."""
-    if question_id in process_log_storage["question_status"]:
-        return jsonify(process_log_storage["question_status"][question_id])
+    status = get_question_status_snapshot(question_id)
+    if status is not None:
+        return conditional_status(status)
     else:
         return jsonify({"error": "Question not found", "done": True})
 
@@ -2030,27 +2344,8 @@ def debug_api():
         <p>Current Time: {time.strftime("%Y-%m-%d %H:%M:%S", time.localtime())}</p>
         """
         
-@app.route('/logs', methods=['GET'])
-def view_logs():
-    """View system logs."""
-    # Get up to 500 most recent logs (to avoid overwhelming the browser)
-    logs = process_log_storage["logs"][-500:] if process_log_storage["logs"] else []
-    
-    # Get current status of questions being processed
-    active_questions = []
-    for q_id, status in process_log_storage["question_status"].items():
-        if not status.get("done", False):
-            active_questions.append({
-                "id": q_id,
-                "stage": status.get("stage", "Unknown"),
-                "progress": status.get("progress", 0),
-                "start_time": status.get("start_time", "Unknown")
-            })
-    
-    # Create a readable timestamp with seconds precision
-    current_time = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime())
-    
-    return render_template_string("""
+# Log viewer page, compiled once at import
+LOGS_HTML = """
     <!DOCTYPE html>
     <html lang="en">
     <head>
@@ -2140,7 +2435,31 @@ def view_logs():
         </div>
     </body>
     </html>
-    """, logs=logs, active_questions=active_questions, current_time=current_time)
+    """
+LOGS_TEMPLATE = app.jinja_env.from_string(LOGS_HTML)
+
+@app.route('/logs', methods=['GET'])
+def view_logs():
+    """View system logs."""
+    # Get the most recent logs (to avoid overwhelming the browser)
+    logs = list(process_log_storage["logs"])
+    
+    # Get current status of questions being processed
+    active_questions = []
+    for q_id in list(process_log_storage["question_status"]):
+        status = get_question_status_snapshot(q_id)
+        if status is not None and not status.get("done", False):
+            active_questions.append({
+                "id": q_id,
+                "stage": status.get("stage", "Unknown"),
+                "progress": status.get("progress", 0),
+                "start_time": status.get("start_time", "Unknown")
+            })
+    
+    # Create a readable timestamp with seconds precision
+    current_time = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime())
+    
+    return render_template(LOGS_TEMPLATE, logs=logs, active_questions=active_questions, current_time=current_time)
 
 
 
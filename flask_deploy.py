@@ -3,6 +3,9 @@ RegCap GPT - Deployment Script (Flask)
 
 This is a dedicated deployment script for the RegCap Flask application,
 configured specifically for Replit's deployment system.
+
+The application (and with it the OpenAI, FAISS and PDF stack) is only
+imported when create_app() is called, e.g. `gunicorn 'flask_deploy:create_app()'`.
 """
 
 import os
@@ -14,15 +17,15 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 logger.info("Initializing RegCap Flask Deployment Script")
 
-try:
-    from app import app  # Import the Flask app
-    logger.info("Successfully imported Flask app from app.py")
-except Exception as e:
-    logger.error(f"Error importing Flask app: {str(e)}")
-    raise
-
-# For handling WSGI deployments - required by Replit
-application = app
+def create_app():
+    """Import and return the Flask app from app.py."""
+    try:
+        from app import app  # Import the Flask app
+        logger.info("Successfully imported Flask app from app.py")
+        return app
+    except Exception as e:
+        logger.error(f"Error importing Flask app: {str(e)}")
+        raise
 
 if __name__ == "__main__":
     # Print information about the environment
@@ -37,11 +40,14 @@ if __name__ == "__main__":
         # Remove Streamlit arguments to prevent conflicts
         sys.argv = [arg for arg in sys.argv if not arg.startswith("--server")]
     
+    # For handling WSGI deployments - required by Replit
+    application = create_app()
+    
     # Run the Flask application
     try:
         port = int(os.environ.get("PORT", 5000))
         logger.info(f"Starting Flask app on port {port}")
-        app.run(host="0.0.0.0", port=port)
+        application.run(host="0.0.0.0", port=port)
     except Exception as e:
         logger.error(f"Error starting Flask app: {str(e)}")
-        raise
\ No newline at end of file
+        raise
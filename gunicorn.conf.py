@@ -0,0 +1,34 @@
+"""
+RegCap GPT - Gunicorn configuration
+
+Serves the Flask application with threaded workers instead of Werkzeug's
+development server. Gunicorn loads this file automatically from the working
+directory, e.g. `gunicorn simple_deploy:app`.
+"""
+
+import ctypes
+import os
+
+# IMPORTANT: Always use the PORT environment variable for deployment
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+
+# Question/upload status, caches and the JSON storage live in process memory,
+# so a single worker process is used and concurrency comes from threads.
+# The hot paths wait on OpenAI over the network, which releases the GIL.
+workers = 1
+worker_class = "gthread"
+threads = int(os.environ.get("GUNICORN_THREADS", 8))
+
+# Answer generation and PDF ingestion can take well over the 30s default
+timeout = 120
+
+# glibc gives busy threads their own malloc arenas, and with many worker
+# threads those arenas fragment and the resident set creeps up. Cap them before
+# the worker starts its threads, unless the environment already chose (via
+# MALLOC_ARENA_MAX, or by preloading jemalloc with LD_PRELOAD).
+M_ARENA_MAX = -8  # mallopt parameter from <malloc.h>
+if "MALLOC_ARENA_MAX" not in os.environ and "jemalloc" not in os.environ.get("LD_PRELOAD", ""):
+    try:
+        ctypes.CDLL("libc.so.6").mallopt(M_ARENA_MAX, 2)
+    except (OSError, AttributeError):
+        pass  # Not glibc
@@ -2,11 +2,13 @@
 RegCap GPT - Main entry point for deployment
 
 This file serves as the main entry point for deploying the RegCap GPT application.
-It imports and runs the Flask application from app.py.
+It runs the Flask application from app.py via flask_deploy.create_app(), so
+importing this module does not load the application stack.
 """
 
-from app import app as application
+from flask_deploy import create_app
 
 # This is the standard way to deploy a Flask app
 if __name__ == "__main__":
-    application.run(host="0.0.0.0", port=5000)
\ No newline at end of file
+    application = create_app()
+    application.run(host="0.0.0.0", port=5000)
@@ -0,0 +1,662 @@
+// Wait for DOM to be fully loaded
+document.addEventListener('DOMContentLoaded', function() {
+    // Initialize hamburger menu for mobile
+    var menuToggle = document.getElementById('menuToggle');
+    var menuOverlay = document.getElementById('menuOverlay');
+    var sidebar = document.getElementById('sidebar');
+
+    // Toggle menu on hamburger button click
+    if (menuToggle) {
+        menuToggle.addEventListener('click', function() {
+            sidebar.classList.toggle('mobile-active');
+            menuOverlay.classList.toggle('active');
+            document.body.style.overflow = sidebar.classList.contains('mobile-active') ? 'hidden' : '';
+        });
+    }
+
+    // Close menu when clicking the overlay
+    if (menuOverlay) {
+        menuOverlay.addEventListener('click', function() {
+            sidebar.classList.remove('mobile-active');
+            menuOverlay.classList.remove('active');
+            document.body.style.overflow = '';
+        });
+    }
+
+    // Close menu when a navigation item is clicked on mobile
+    var navItemsForMenu = document.querySelectorAll('.nav-item');
+    navItemsForMenu.forEach(function(item) {
+        item.addEventListener('click', function() {
+            if (window.innerWidth <= 768 && item.id !== 'featureToggle') {
+                sidebar.classList.remove('mobile-active');
+                menuOverlay.classList.remove('active');
+                document.body.style.overflow = '';
+            }
+        });
+    });
+
+    // Initialize feature list toggle
+    var featureToggle = document.getElementById('featureToggle');
+    var featureList = document.getElementById('featureList');
+
+    if (featureToggle && featureList) {
+        featureToggle.addEventListener('click', function() {
+            var toggleIcon = this.querySelector('.toggle-icon');
+
+            if (featureList.style.display === 'none') {
+                featureList.style.display = 'block';
+                if (toggleIcon) {
+                    toggleIcon.className = 'fa fa-angle-up toggle-icon';
+                }
+            } else {
+                featureList.style.display = 'none';
+                if (toggleIcon) {
+                    toggleIcon.className = 'fa fa-angle-down toggle-icon';
+                }
+            }
+        });
+    }
+
+    // Content navigation
+    var navItems = document.querySelectorAll('.nav-item');
+    var PANEL_TITLES = Object.freeze({
+        'chat-panel': ['fa fa-comments', 'Chat with your Documents'],
+        'docs-panel': ['fa fa-file-pdf-o', 'Document Management'],
+        'diagrams-panel': ['fa fa-sitemap', 'Generated Diagrams'],
+        'sessions-panel': ['fa fa-database', 'Session Management'],
+        'about-panel': ['fa fa-info-circle', 'About RegCap GPT']
+    });
+
+    // Set an icon and label as DOM nodes, so no HTML is parsed on each click
+    function setIconLabel(element, iconClass, text) {
+        var icon = document.createElement('i');
+        icon.className = iconClass;
+        element.replaceChildren(icon, ' ' + text);
+    }
+
+    // Function to switch panels - extracted for reuse
+    function switchToPanel(panelId, clickedNavItem) {
+        if (!panelId) return;
+
+        // Log panel change attempt for debugging
+        console.log('Switching to panel:', panelId);
+
+        // Hide all content panels
+        var contentPanels = document.querySelectorAll('.content-panel');
+        for (var j = 0; j < contentPanels.length; j++) {
+            contentPanels[j].classList.remove('active');
+        }
+
+        // Remove active class from all navigation items
+        for (var k = 0; k < navItems.length; k++) {
+            navItems[k].classList.remove('active');
+        }
+
+        // Show the selected content panel
+        var panelElement = document.getElementById(panelId);
+        if (panelElement) {
+            panelElement.classList.add('active');
+            console.log('Panel activated:', panelId);
+        } else {
+            console.log('Panel element not found:', panelId);
+        }
+
+        // Update panel title
+        if (PANEL_TITLES[panelId]) {
+            setIconLabel(document.getElementById('currentPanelTitle'), PANEL_TITLES[panelId][0], PANEL_TITLES[panelId][1]);
+        }
+
+        // Add active class to clicked navigation item
+        if (clickedNavItem) {
+            clickedNavItem.classList.add('active');
+        }
+
+        // Update URL based on the active panel
+        updateURL(panelId);
+
+        // On mobile, ensure we scroll to top of panel
+        if (window.innerWidth <= 768) {
+            window.scrollTo(0, 0);
+        }
+    }
+
+    // Function to update URL based on active panel
+    function updateURL(panelId) {
+        const currentPath = window.location.pathname;
+        let newURL;
+
+        if (panelId === 'about-panel') {
+            // If switching to about panel, use /aboutus URL
+            newURL = '/aboutus';
+        } else {
+            // For other panels, use root URL
+            newURL = '/';
+        }
+
+        // Only update if URL needs to change
+        if (currentPath !== newURL) {
+            window.history.pushState({}, '', newURL);
+        }
+    }
+
+    // Add click event to each navigation item
+    for (var i = 0; i < navItems.length; i++) {
+        navItems[i].addEventListener('click', function() {
+            // If this is the features toggle, don't navigate
+            if (this.id === 'featureToggle') {
+                return;
+            }
+
+            // Get the panel id from data-panel attribute
+            var panelId = this.getAttribute('data-panel');
+            switchToPanel(panelId, this);
+        });
+    }
+
+    // Theme toggle functionality
+    function setupThemeToggle() {
+        var themeToggle = document.getElementById('mobileThemeToggle');
+        var savedTheme = localStorage.getItem('theme');
+
+        // Apply saved theme
+        if (savedTheme === 'dark') {
+            document.documentElement.setAttribute('data-theme', 'dark');
+            if (themeToggle) {
+                setIconLabel(themeToggle, 'fa fa-sun-o', 'Light Mode');
+            }
+        }
+
+        // Toggle theme on click
+        if (themeToggle) {
+            themeToggle.addEventListener('click', function() {
+                if (document.documentElement.getAttribute('data-theme') === 'dark') {
+                    document.documentElement.removeAttribute('data-theme');
+                    localStorage.setItem('theme', 'light');
+                    setIconLabel(themeToggle, 'fa fa-moon-o', 'Dark Mode');
+                } else {
+                    document.documentElement.setAttribute('data-theme', 'dark');
+                    localStorage.setItem('theme', 'dark');
+                    setIconLabel(themeToggle, 'fa fa-sun-o', 'Light Mode');
+                }
+            });
+        }
+    }
+
+    // Initialize theme toggle
+    setupThemeToggle();
+
+    // Check URL parameters and path for initial panel activation
+    const urlParams = new URLSearchParams(window.location.search);
+    const tabParam = urlParams.get('tab');
+    const isAboutUsPage = window.location.pathname === '/aboutus';
+
+    if (tabParam === 'about' || isAboutUsPage) {
+        // Activate about panel
+        switchToPanel('about-panel', document.querySelector('[data-panel="about-panel"]'));
+    } else {
+        // Default to chat panel
+        switchToPanel('chat-panel', document.querySelector('[data-panel="chat-panel"]'));
+    }
+
+    // Initialize Mermaid diagrams
+    if (typeof mermaid !== 'undefined') {
+        mermaid.initialize({
+            startOnLoad: true,
+            securityLevel: 'loose',
+            theme: 'default',
+            flowchart: {
+                htmlLabels: true,
+                useMaxWidth: true,
+                curve: 'linear'
+            }
+        });
+    }
+
+    // Form handling for question submission
+    var questionForm = document.getElementById('questionForm');
+    if (questionForm) {
+        questionForm.addEventListener('submit', function(e) {
+            e.preventDefault();
+
+            var questionInput = document.getElementById('questionInput');
+            var question = questionInput.value.trim();
+
+            if (question) {
+                // Add user message to chat
+                var chatMessages = document.getElementById('chatMessages');
+
+                // Clear "No chat history" message if it exists
+                if (chatMessages.querySelector('.text-center.text-muted')) {
+                    chatMessages.innerHTML = ''; // Clear the "No chat history" message
+                }
+
+                var userDiv = document.createElement('div');
+                userDiv.className = 'user-message';
+                userDiv.innerHTML = '<strong>You:</strong> ' + question;
+                chatMessages.appendChild(userDiv);
+
+                // Clear input and focus for next question
+                questionInput.value = '';
+                setTimeout(function() {
+                    questionInput.focus();
+                }, 100);
+
+                // Scroll to bottom
+                chatMessages.scrollTop = chatMessages.scrollHeight;
+
+                // On mobile, ensure the form remains visible
+                if (window.innerWidth <= 768) {
+                    // Get the form's position
+                    var formRect = questionForm.getBoundingClientRect();
+                    // If the form is not fully visible, scroll the page to show it
+                    if (formRect.bottom > window.innerHeight) {
+                        window.scrollTo({
+                            top: window.scrollY + (formRect.bottom - window.innerHeight) + 20,
+                            behavior: 'smooth'
+                        });
+                    }
+                }
+
+                // Add temporary processing message
+                var processingDiv = document.createElement('div');
+                processingDiv.className = 'bot-message';
+                processingDiv.innerHTML = '<strong>RegCap GPT:</strong> <i class="fa fa-spinner fa-spin"></i> Processing your question...';
+                chatMessages.appendChild(processingDiv);
+                chatMessages.scrollTop = chatMessages.scrollHeight;
+
+                // Send question to the server
+                fetch('/ask-question', {
+                    method: 'POST',
+                    headers: {
+                        'Content-Type': 'application/json'
+                    },
+                    body: JSON.stringify({
+                        question: question
+                    })
+                })
+                .then(response => response.json())
+                .then(data => {
+                    if (data.success) {
+                        var questionId = data.question_id;
+
+                        var showStatus = function(status) {
+                            if (status.done || status.error) {
+                                clearInterval(pollInterval);
+
+                                if (status.error) {
+                                    processingDiv.innerHTML = '<strong>RegCap GPT:</strong> <span class="text-danger">Error: ' + status.error + '</span>';
+                                } else {
+                                    // Format the answer with markdown
+                                    processingDiv.innerHTML = '<strong>RegCap GPT:</strong> ' + status.answer;
+
+                                    // If there's a diagram, display it
+                                    if (status.has_diagram) {
+                                        var diagramDiv = document.createElement('div');
+                                        diagramDiv.className = 'bot-message diagram-message';
+
+                                        // Make sure we have a clean diagram code
+                                        var diagramCode = status.diagram_code || "";
+
+                                        // Check if the diagram code is complete/valid
+                                        if (!diagramCode || diagramCode.length < 20) {
+                                            // Invalid or empty diagram code - show a fallback
+                                            diagramDiv.innerHTML = '<strong>Diagram:</strong> <div class="alert alert-warning">Unable to render diagram due to insufficient code.</div>';
+                                            chatMessages.appendChild(diagramDiv);
+                                            return;
+                                        }
+
+                                        // Process and escape the diagram code
+                                        diagramCode = diagramCode
+                                            .replace(/&/g, '&amp;')
+                                            .replace(/</g, '&lt;')
+                                            .replace(/>/g, '&gt;')
+                                            .replace(/"/g, '&quot;')
+                                            .replace(/'/g, '&#039;');
+
+                                        // Create diagram container with unique ID
+                                        var diagramId = 'diagram_' + new Date().getTime();
+                                        diagramDiv.innerHTML = '<strong>Diagram:</strong> <div id="' + diagramId + '" class="mermaid mermaid-container">' + diagramCode + '</div>';
+                                        chatMessages.appendChild(diagramDiv);
+
+                                        // Initialize mermaid with retry mechanism
+                                        setTimeout(function() {
+                                            try {
+                                                if (typeof mermaid !== 'undefined') {
+                                                    console.log("Rendering diagram with code length:", diagramCode.length);
+                                                    mermaid.init(undefined, '#' + diagramId);
+
+                                                    // Add error-checking timeout to catch rendering failures
+                                                    setTimeout(function() {
+                                                        var diagramElement = document.getElementById(diagramId);
+                                                        if (diagramElement && diagramElement.innerHTML.includes("Syntax error")) {
+                                                            console.log("Detected mermaid syntax error, showing fallback");
+                                                            // Clean up the error message and show the diagram code
+                                                            diagramElement.innerHTML = 
+                                                                '<div class="alert alert-warning" style="background-color: var(--secondary-bg) !important; color: var(--primary-text) !important; border-color: var(--border-color) !important;">The diagram could not be rendered properly.</div>' +
+                                                                '<pre style="background-color: var(--tertiary-bg) !important; color: var(--primary-text) !important; padding:10px; border-radius:5px;">' + 
+                                                                diagramCode + '</pre>';
+                                                        }
+                                                    }, 1000);
+                                                }
+                                            } catch (e) {
+                                                console.error("Error rendering diagram:", e);
+                                                // Fallback to simple display
+                                                var errorElement = document.getElementById(diagramId);
+                                                if (errorElement) {
+                                                    errorElement.innerHTML = 
+                                                        '<div class="alert alert-warning" style="background-color: var(--secondary-bg) !important; color: var(--primary-text) !important; border-color: var(--border-color) !important;">The diagram could not be rendered.</div>' +
+                                                        '<pre style="background-color: var(--tertiary-bg) !important; color: var(--primary-text) !important; padding:10px; border-radius:5px;">' + 
+                                                        diagramCode + '</pre>';
+                                                }
+                                            }
+                                        }, 500); // Small delay to ensure the DOM is updated
+                                    }
+                                }
+
+                                // Scroll to the bottom of the chat container
+                                chatMessages.scrollTop = chatMessages.scrollHeight;
+
+                                // On mobile, ensure the question form is visible after answer
+                                if (window.innerWidth <= 768) {
+                                    // Make sure the form is visible
+                                    var questionForm = document.getElementById('questionForm');
+                                    if (questionForm) {
+                                        // Scroll the form into view with some padding
+                                        setTimeout(function() {
+                                            questionForm.scrollIntoView({behavior: 'smooth', block: 'end'});
+                                            // Focus on the input to prepare for next question
+                                            var questionInput = document.getElementById('questionInput');
+                                            if (questionInput) {
+                                                questionInput.focus();
+                                            }
+                                        }, 300);
+                                    }
+                                }
+
+
+                            } else if (status.stage && status.progress) {
+                                // Update the processing message with the current status
+                                processingDiv.innerHTML = '<strong>RegCap GPT:</strong> <i class="fa fa-spinner fa-spin"></i> ' + 
+                                                         status.stage + ' (' + status.progress + '%)';
+                            }
+                        };
+
+                        // Poll for status updates; an unchanged status comes back as an
+                        // empty 304 that the browser answers from its cache
+                        var pollInterval = setInterval(function() {
+                            fetch('/question-status/' + questionId)
+                                .then(response => response.json())
+                                .then(showStatus)
+                                .catch(error => {
+                                    console.error('Error checking question status:', error);
+                                    processingDiv.innerHTML = '<strong>RegCap GPT:</strong> <span class="text-danger">Error checking question status. Please try again.</span>';
+                                    clearInterval(pollInterval);
+                                });
+                        }, 1000);
+                    } else {
+                        processingDiv.innerHTML = '<strong>RegCap GPT:</strong> <span class="text-danger">Error: ' + (data.error || 'Failed to process question') + '</span>';
+                    }
+                })
+                .catch(error => {
+                    console.error('Error submitting question:', error);
+                    processingDiv.innerHTML = '<strong>RegCap GPT:</strong> <span class="text-danger">Error submitting question. Please try again.</span>';
+                });
+            }
+        });
+    }
+
+    // Function to update the document list display
+    function updateDocumentList(documents) {
+        // Find the documents section by searching for the h5 with "Uploaded Documents" text
+        const cardHeaders = document.querySelectorAll('.card-header h5');
+        let documentsCardBody = null;
+
+        for (const header of cardHeaders) {
+            if (header.textContent.includes('Uploaded Documents')) {
+                documentsCardBody = header.closest('.card').querySelector('.card-body');
+                break;
+            }
+        }
+
+        if (!documentsCardBody) return;
+
+        if (documents && Object.keys(documents).length > 0) {
+            let html = '<div class="list-group">';
+            for (const [docName, chunks] of Object.entries(documents)) {
+                html += `
+                    <div class="list-group-item" style="background-color: var(--tertiary-bg) !important; color: var(--primary-text) !important; border-color: var(--border-color) !important;">
+                        <i class="fa fa-file-pdf-o"></i> ${docName}
+                        <span class="badge bg-secondary float-end">
+                            ${chunks.length} chunks
+                        </span>
+                    </div>
+                `;
+            }
+            html += '</div>';
+            documentsCardBody.innerHTML = html;
+        } else {
+            documentsCardBody.innerHTML = `
+                <div class="text-center my-4">
+                    <i class="fa fa-folder-open-o fa-2x mb-3" style="color: var(--primary-text) !important;"></i>
+                    <p style="color: var(--primary-text) !important;">No documents have been uploaded yet.</p>
+                </div>
+            `;
+        }
+    }
+
+    // Poll a background upload job until the server has finished ingesting it
+    function waitForUpload(jobId) {
+        return new Promise(function(resolve, reject) {
+            var pollInterval = setInterval(function() {
+                fetch('/upload-status/' + jobId)
+                    .then(response => response.json())
+                    .then(status => {
+                        if (status.done) {
+                            clearInterval(pollInterval);
+                            resolve(status);
+                        }
+                    })
+                    .catch(error => {
+                        clearInterval(pollInterval);
+                        reject(error);
+                    });
+            }, 1000);
+        });
+    }
+
+    // File upload handling
+    var uploadForm = document.getElementById('uploadForm');
+    if (uploadForm) {
+        uploadForm.addEventListener('submit', function(e) {
+            e.preventDefault();
+
+            var fileInput = document.getElementById('documentUpload');
+            if (fileInput.files.length > 0) {
+                // Show loading message
+                var uploadBtn = this.querySelector('button[type="submit"]');
+                var originalBtnText = uploadBtn.innerHTML;
+                uploadBtn.innerHTML = '<i class="fa fa-spinner fa-spin"></i> Processing...';
+                uploadBtn.disabled = true;
+
+                // Create FormData and append files
+                var formData = new FormData();
+                for (var i = 0; i < fileInput.files.length; i++) {
+                    formData.append('files', fileInput.files[i]);
+                }
+
+                // Send files to the server
+                fetch('/upload-files', {
+                    method: 'POST',
+                    body: formData
+                })
+                .then(response => response.json())
+                .then(data => data.job_id ? waitForUpload(data.job_id) : data)
+                .then(data => {
+                    if (data.success) {
+                        // Reset button first
+                        uploadBtn.innerHTML = originalBtnText;
+                        uploadBtn.disabled = false;
+
+                        // Show success message in UI instead of alert
+                        var successMsg = document.createElement('div');
+                        successMsg.className = 'alert alert-success mt-2';
+                        successMsg.innerHTML = '<i class="fa fa-check-circle"></i> Files successfully processed: ' + data.message;
+                        uploadForm.appendChild(successMsg);
+
+                        // Clear the file input
+                        fileInput.value = '';
+
+                        // Update the document list if available
+                        if (data.documents) {
+                            updateDocumentList(data.documents);
+                        }
+
+                        // Clear the success message after a few seconds
+                        setTimeout(function() {
+                            if (successMsg && successMsg.parentNode) {
+                                successMsg.parentNode.removeChild(successMsg);
+                            }
+                        }, 3000);
+                    } else {
+                        alert('Error: ' + data.error);
+                        // Reset button
+                        uploadBtn.innerHTML = originalBtnText;
+                        uploadBtn.disabled = false;
+                    }
+                })
+                .catch(error => {
+                    console.error('Error:', error);
+                    alert('An error occurred while uploading the files.');
+                    // Reset button
+                    uploadBtn.innerHTML = originalBtnText;
+                    uploadBtn.disabled = false;
+                });
+            } else {
+                alert('Please select at least one file to upload.');
+            }
+        });
+    }
+
+    // New session button
+    var newSessionBtn = document.getElementById('newSessionBtn');
+    if (newSessionBtn) {
+        newSessionBtn.addEventListener('click', function() {
+            if (confirm('Create a new session? This will start with a clean slate.')) {
+                // Create a new session via API
+                fetch('/new-session', {
+                    method: 'POST',
+                    headers: {
+                        'Content-Type': 'application/json'
+                    }
+                })
+                .then(response => response.json())
+                .then(data => {
+                    if (data.success) {
+                        alert('New session created successfully!');
+                        window.location.reload();
+                    } else {
+                        alert('Error: ' + data.error);
+                    }
+                })
+                .catch(error => {
+                    console.error('Error:', error);
+                    alert('An error occurred while creating a new session.');
+                });
+            }
+        });
+    }
+
+    // Session switch buttons
+    var sessionSwitchBtns = document.querySelectorAll('.session-switch-btn');
+    for (var s = 0; s < sessionSwitchBtns.length; s++) {
+        sessionSwitchBtns[s].addEventListener('click', function() {
+            var sessionId = this.getAttribute('data-session-id');
+            if (confirm('Switch to session ' + sessionId + '?')) {
+                // Switch to the selected session via API
+                fetch('/switch-session', {
+                    method: 'POST',
+                    headers: {
+                        'Content-Type': 'application/json'
+                    },
+                    body: JSON.stringify({
+                        session_id: sessionId
+                    })
+                })
+                .then(response => response.json())
+                .then(data => {
+                    if (data.success) {
+                        alert('Switched to session ' + sessionId);
+                        window.location.reload();
+                    } else {
+                        alert('Error: ' + data.error);
+                    }
+                })
+                .catch(error => {
+                    console.error('Error:', error);
+                    alert('An error occurred while switching sessions.');
+                });
+            }
+        });
+    }
+});
+
+// Contact form handling
+var contactForm = document.getElementById('contactForm');
+if (contactForm) {
+    contactForm.addEventListener('submit', function(e) {
+        e.preventDefault();
+
+        var submitBtn = document.getElementById('contactSubmitBtn');
+        var statusDiv = document.getElementById('contactStatus');
+        var name = document.getElementById('contactName').value.trim();
+        var email = document.getElementById('contactEmail').value.trim();
+        var organization = document.getElementById('contactOrg').value.trim();
+        var message = document.getElementById('contactMessage').value.trim();
+
+        // Basic validation
+        if (!name || !email || !message) {
+            statusDiv.innerHTML = '<div class="alert alert-danger alert-sm">Please fill in all required fields.</div>';
+            statusDiv.style.display = 'block';
+            return;
+        }
+
+        // Disable submit button and show loading
+        submitBtn.disabled = true;
+        submitBtn.innerHTML = '<i class="fa fa-spinner fa-spin"></i> Sending...';
+        statusDiv.style.display = 'none';
+
+        // Send contact form data
+        fetch('/contact', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify({
+                name: name,
+                email: email,
+                organization: organization,
+                message: message
+            })
+        })
+        .then(response => response.json())
+        .then(data => {
+            if (data.success) {
+                statusDiv.innerHTML = '<div class="alert alert-success alert-sm">' + data.message + '</div>';
+                contactForm.reset(); // Clear the form
+            } else {
+                statusDiv.innerHTML = '<div class="alert alert-danger alert-sm">' + data.message + '</div>';
+            }
+            statusDiv.style.display = 'block';
+        })
+        .catch(error => {
+            console.error('Error:', error);
+            statusDiv.innerHTML = '<div class="alert alert-danger alert-sm">An error occurred while sending your message.</div>';
+            statusDiv.style.display = 'block';
+        })
+        .finally(() => {
+            // Re-enable submit button
+            submitBtn.disabled = false;
+            submitBtn.innerHTML = '<i class="fa fa-paper-plane"></i> Send';
+        });
+    });
+}
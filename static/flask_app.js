@@ -0,0 +1,531 @@
+// Initialize Mermaid with more robust configuration
+mermaid.initialize({
+    startOnLoad: true,
+    theme: 'default',
+    logLevel: 'fatal',
+    securityLevel: 'loose',
+    flowchart: { 
+        htmlLabels: true,
+        curve: 'basis'
+    },
+    sequence: {
+        diagramMarginX: 50,
+        diagramMarginY: 10,
+        actorMargin: 50,
+        width: 150,
+        height: 65
+    }
+});
+
+// Wait for DOM to be fully loaded before setting up tab navigation
+document.addEventListener('DOMContentLoaded', function() {
+    console.log('Setting up tab navigation');
+
+    // Tab switching with data-tab attributes
+    const tabButtons = document.querySelectorAll('.tab');
+    tabButtons.forEach(button => {
+        button.addEventListener('click', function() {
+            const tabId = this.getAttribute('data-tab');
+            console.log('Switching to tab:', tabId);
+
+            // Hide all tab contents
+            document.querySelectorAll('.tab-content').forEach(content => {
+                content.classList.remove('active');
+            });
+
+            // Remove active class from buttons
+            tabButtons.forEach(btn => {
+                btn.classList.remove('active');
+            });
+
+            // Show selected tab
+            document.getElementById(tabId).classList.add('active');
+            this.classList.add('active');
+
+            // Special handling for diagrams tab
+            if (tabId === 'diagrams-tab') {
+                const notification = document.getElementById('diagrams-notification');
+                if (notification) {
+                    notification.style.display = 'none';
+                }
+
+                // Force re-render mermaid diagrams
+                try {
+                    mermaid.init(undefined, '.mermaid');
+                } catch(e) {
+                    console.error('Error re-rendering mermaid diagrams:', e);
+                }
+            }
+        });
+    });
+});
+
+// Scroll chat to bottom
+function scrollChatToBottom() {
+    var chatContainer = document.getElementById('chat-messages');
+    chatContainer.scrollTop = chatContainer.scrollHeight;
+}
+
+// Check if we have a diagram
+function checkAndShowDiagramNotification() {
+    var mermaidDivs = document.querySelectorAll('.mermaid');
+    if (mermaidDivs.length > 0) {
+        var notificationElement = document.getElementById('diagrams-notification');
+        if (notificationElement) {
+            notificationElement.style.display = 'block';
+        }
+
+        // Look for special alert in chat messages
+        var botMessages = document.querySelectorAll('.bot-message');
+        for(var i = 0; i < botMessages.length; i++) {
+            if(botMessages[i].innerHTML.includes('Please click on the "Diagrams" tab above')) {
+                // Check if button already exists to avoid duplicates
+                if (!botMessages[i].querySelector('.btn-warning')) {
+                    // Add a click helper
+                    var helper = document.createElement('button');
+                    helper.innerHTML = 'View Diagram';
+                    helper.className = 'btn btn-warning mt-2';
+                    helper.onclick = function() {
+                        document.getElementById('diagrams-tab-button').click();
+                    };
+                    botMessages[i].appendChild(helper);
+                }
+            }
+        }
+    }
+}
+
+// Function to ensure diagrams are properly rendered
+function initMermaidDiagrams() {
+    try {
+        // Clean up any previous mermaid initialization
+        document.querySelectorAll('.mermaid svg').forEach(function(el) {
+            el.remove();
+        });
+
+        // Reinitialize mermaid
+        mermaid.init(undefined, '.mermaid');
+    } catch(e) {
+        console.error("Error initializing mermaid diagrams:", e);
+    }
+}
+
+// Uploads are ingested in the background; poll the job and reload once it finishes
+document.addEventListener('DOMContentLoaded', function() {
+    const jobId = new URLSearchParams(window.location.search).get('upload_job');
+    if (!jobId) {
+        return;
+    }
+
+    const statusDiv = document.getElementById('upload-status');
+    statusDiv.textContent = 'Processing uploaded documents...';
+    document.getElementById('documents-tab-button').click();
+
+    const pollInterval = setInterval(function() {
+        fetch('/upload_status/' + encodeURIComponent(jobId))
+            .then(response => response.json())
+            .then(status => {
+                if (!status.done) {
+                    return;
+                }
+                clearInterval(pollInterval);
+                if (status.success) {
+                    window.location.replace('/');
+                } else {
+                    statusDiv.textContent = status.error;
+                }
+            })
+            .catch(error => {
+                clearInterval(pollInterval);
+                statusDiv.textContent = 'Error checking upload status: ' + error;
+            });
+    }, 1000);
+});
+
+// Set an icon and label as DOM nodes, so no HTML is parsed on each click
+function setIconLabel(element, iconClass, text) {
+    const icon = document.createElement('i');
+    icon.className = iconClass;
+    element.replaceChildren(icon, ' ' + text);
+}
+
+// Dark mode toggle functionality
+document.addEventListener('DOMContentLoaded', function() {
+    console.log('Setting up dark mode toggle');
+
+    const darkModeToggle = document.getElementById('darkModeToggle');
+    if (!darkModeToggle) {
+        console.error('Dark mode toggle button not found');
+        return;
+    }
+
+    const htmlElement = document.documentElement;
+
+    // Check for saved theme preference or respect OS preference
+    const savedTheme = localStorage.getItem('theme');
+    const prefersDarkMode = window.matchMedia('(prefers-color-scheme: dark)').matches;
+
+    // Apply dark theme if saved or OS prefers dark
+    if (savedTheme === 'dark' || (!savedTheme && prefersDarkMode)) {
+        htmlElement.setAttribute('data-theme', 'dark');
+        setIconLabel(darkModeToggle, 'fa fa-sun-o', 'Light Mode');
+        // Update Mermaid theme
+        mermaid.initialize({ theme: 'dark' });
+    }
+
+    // Toggle theme when button is clicked
+    darkModeToggle.addEventListener('click', function() {
+        console.log('Dark mode toggle clicked');
+
+        if (htmlElement.getAttribute('data-theme') === 'dark') {
+            htmlElement.removeAttribute('data-theme');
+            localStorage.setItem('theme', 'light');
+            setIconLabel(darkModeToggle, 'fa fa-moon-o', 'Dark Mode');
+            // Update Mermaid theme
+            mermaid.initialize({ theme: 'default' });
+        } else {
+            htmlElement.setAttribute('data-theme', 'dark');
+            localStorage.setItem('theme', 'dark');
+            setIconLabel(darkModeToggle, 'fa fa-sun-o', 'Light Mode');
+            // Update Mermaid theme
+            mermaid.initialize({ theme: 'dark' });
+        }
+
+        // Reinitialize Mermaid diagrams with the new theme
+        try {
+            setTimeout(function() {
+                initMermaidDiagrams();
+            }, 100);
+        } catch (error) {
+            console.error("Error updating Mermaid diagrams after theme change:", error);
+        }
+    });
+});
+
+// Session management via AJAX
+function setupSessionManagement() {
+    // Create new session
+    const createNewSessionBtn = document.getElementById('createNewSessionBtn');
+    if (createNewSessionBtn) {
+        createNewSessionBtn.addEventListener('click', function() {
+            // Display loading state
+            createNewSessionBtn.disabled = true;
+            createNewSessionBtn.innerHTML = 'Creating...';
+
+            // Send AJAX request
+            fetch('/new_session', {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                },
+            })
+            .then(response => {
+                if (response.ok) {
+                    // Refresh only the content, not the entire page
+                    window.location.href = '/?t=' + new Date().getTime();
+                }
+            })
+            .catch(error => {
+                console.error('Error creating new session:', error);
+                createNewSessionBtn.disabled = false;
+                createNewSessionBtn.innerHTML = 'Create New Session';
+            });
+        });
+    }
+
+    // Setup switch session buttons
+    const switchButtons = document.querySelectorAll('.switch-session-btn');
+    switchButtons.forEach(function(button) {
+        button.addEventListener('click', function() {
+            const sessionId = this.getAttribute('data-session-id');
+
+            // Display loading state
+            button.disabled = true;
+            button.innerHTML = 'Switching...';
+
+            // Create form data
+            const formData = new FormData();
+            formData.append('session_id', sessionId);
+
+            // Send AJAX request
+            fetch('/switch_session', {
+                method: 'POST',
+                body: formData
+            })
+            .then(response => {
+                if (response.ok) {
+                    // Refresh only the content, not the entire page
+                    window.location.href = '/?t=' + new Date().getTime();
+                }
+            })
+            .catch(error => {
+                console.error('Error switching session:', error);
+                button.disabled = false;
+                button.innerHTML = 'Switch';
+            });
+        });
+    });
+}
+
+// Setup AJAX form submission for questions
+function setupQuestionFormAjax() {
+    const questionForm = document.getElementById('question-form');
+    const askButton = document.getElementById('ask-button');
+    const statusDiv = document.getElementById('question-status');
+    const questionInput = document.getElementById('question');
+
+    if (questionForm) {
+        questionForm.addEventListener('submit', function(e) {
+            e.preventDefault(); // Prevent regular form submission
+
+            const question = questionInput.value.trim();
+            if (!question) return; // Don't submit empty questions
+
+            // Show loading status and disable button
+            askButton.disabled = true;
+            statusDiv.style.display = 'block';
+
+            streamQuestion(question);
+        });
+    }
+
+    // Stream the answer over Server-Sent Events as it is generated
+    function streamQuestion(question) {
+        const chatMessages = document.getElementById('chat-messages');
+        const userMsg = document.createElement('div');
+        userMsg.className = 'message user-message';
+        userMsg.textContent = question;
+        chatMessages.appendChild(userMsg);
+
+        const botMsg = document.createElement('div');
+        botMsg.className = 'message bot-message';
+        botMsg.innerHTML = '<strong>Bot:</strong> <span class="answer-text"></span>';
+        chatMessages.appendChild(botMsg);
+        const answerText = botMsg.querySelector('.answer-text');
+
+        questionInput.value = '';
+        scrollChatToBottom();
+
+        let answer = '';
+        const source = new EventSource('/ask_stream?question=' + encodeURIComponent(question));
+
+        function finish() {
+            source.close();
+            askButton.disabled = false;
+            statusDiv.style.display = 'none';
+        }
+
+        // Diagrams are not streamed; hand them to the background /ask flow
+        function fallBackToPolling() {
+            source.close();
+            chatMessages.removeChild(userMsg);
+            chatMessages.removeChild(botMsg);
+            submitQuestion(question);
+        }
+
+        source.onmessage = function(event) {
+            answer += JSON.parse(event.data);
+            answerText.textContent = answer;
+            scrollChatToBottom();
+        };
+        source.addEventListener('done', finish);
+        source.addEventListener('diagram', fallBackToPolling);
+        source.onerror = function() {
+            if (answer) {
+                finish();
+            } else {
+                fallBackToPolling();
+            }
+        };
+    }
+
+    // Submit the question to /ask and poll for the answer
+    function submitQuestion(question) {
+        // Create the form data from the question
+        const formData = new FormData();
+        formData.append('question', question);
+
+        // Send AJAX request with x-requested-with header
+        fetch('/ask', {
+            method: 'POST',
+            headers: {
+                'X-Requested-With': 'XMLHttpRequest'
+            },
+            body: formData
+        })
+        .then(response => {
+            if (response.ok) {
+                return response.json().then(data => {
+                    console.log('Question submitted:', data);
+
+                    // Add placeholder message to the chat
+                    const chatMessages = document.getElementById('chat-messages');
+                    const userMsg = document.createElement('div');
+                    userMsg.className = 'message user-message';
+                    userMsg.textContent = question;
+                    chatMessages.appendChild(userMsg);
+
+                    const botMsg = document.createElement('div');
+                    botMsg.className = 'message bot-message';
+                    botMsg.innerHTML = '<div class="processing-message">Processing your question... <div class="spinner-border spinner-border-sm text-primary" role="status"><span class="visually-hidden">Loading...</span></div></div>';
+                    chatMessages.appendChild(botMsg);
+
+                    // Set up status polling if we have a question ID
+                    if (data.question_id) {
+                        startStatusPolling(data.question_id, botMsg);
+                    }
+
+                    scrollChatToBottom();
+
+                    // Clear input
+                    questionInput.value = '';
+
+                    // Simply re-enable the button after a delay
+                    setTimeout(function() {
+                        askButton.disabled = false;
+                        statusDiv.style.display = 'none';
+                    }, 1500);
+
+                    // Add a small refresh button next to the "Processing" text in the chat
+                    const processingMsgs = document.querySelectorAll('.processing-message');
+                    processingMsgs.forEach(msg => {
+                        // Only add refresh button if it doesn't already have one
+                        if (!msg.querySelector('.refresh-btn')) {
+                            const refreshBtn = document.createElement('button');
+                            refreshBtn.className = 'btn btn-sm btn-outline-primary refresh-btn ms-2';
+                            refreshBtn.innerHTML = '<i class="fa fa-refresh"></i>';
+                            refreshBtn.title = "Check for answer";
+                            refreshBtn.onclick = function() { window.location.reload(); };
+                            msg.appendChild(refreshBtn);
+                        }
+                    });
+                });
+            } else {
+                console.error('Failed to submit question');
+                statusDiv.textContent = 'Error submitting question. Please try again.';
+                askButton.disabled = false;
+            }
+        })
+        .catch(error => {
+            console.error('Error submitting question:', error);
+            statusDiv.textContent = 'Error: ' + error.message;
+            askButton.disabled = false;
+        });
+    }
+}
+
+// Function to poll for status updates
+function startStatusPolling(questionId, botMsg) {
+    console.log('Starting status polling for question:', questionId);
+
+    // Add status indicator to the bot message
+    const statusDiv = document.createElement('div');
+    statusDiv.className = 'status-indicator mt-2';
+    statusDiv.innerHTML = `
+        <div class="card p-2 bg-light">
+            <div class="d-flex justify-content-between align-items-center">
+                <span class="status-text small">Initializing...</span>
+                <span class="status-percentage badge bg-primary">5%</span>
+            </div>
+            <div class="progress mt-1" style="height: 4px;">
+                <div class="progress-bar progress-bar-striped progress-bar-animated" 
+                     role="progressbar" style="width: 5%;" 
+                     aria-valuenow="5" aria-valuemin="0" aria-valuemax="100"></div>
+            </div>
+        </div>
+    `;
+
+    botMsg.appendChild(statusDiv);
+
+    const statusText = statusDiv.querySelector('.status-text');
+    const statusPercentage = statusDiv.querySelector('.status-percentage');
+    const progressBar = statusDiv.querySelector('.progress-bar');
+
+    let pollCount = 0;
+    let lastStage = '';
+
+    // Set up the polling interval
+    const pollInterval = setInterval(() => {
+        pollCount++;
+
+        // Check the status
+        fetch(`/get_question_status/${questionId}`)
+        .then(response => response.json())
+        .then(status => {
+            console.log('Question status:', status);
+
+            // Update the UI with the status
+            if (status.stage && status.stage !== lastStage) {
+                statusText.innerText = status.stage;
+                lastStage = status.stage;
+            }
+
+            if (status.progress !== undefined) {
+                const progress = status.progress;
+                statusPercentage.innerText = `${progress}%`;
+                progressBar.style.width = `${progress}%`;
+                progressBar.setAttribute('aria-valuenow', progress);
+
+                // Update color based on progress
+                if (progress > 75) {
+                    progressBar.className = 'progress-bar progress-bar-striped progress-bar-animated bg-success';
+                } else if (progress > 50) {
+                    progressBar.className = 'progress-bar progress-bar-striped progress-bar-animated bg-info';
+                }
+            }
+
+            // Stop polling once the answer has been stored for this question
+            if ((status.done || status.error) && status.answer != null) {
+                console.log('Question processing complete:', status);
+                clearInterval(pollInterval);
+
+                // Show the answer in place instead of reloading the whole page
+                botMsg.innerHTML = '<strong>Bot:</strong> ' + status.answer;
+
+                // Keep any error visible under the answer
+                if (status.error) {
+                    statusDiv.querySelector('.card').className = 'card p-2 bg-danger-subtle';
+                    statusText.className = 'status-text small text-danger';
+                    statusText.innerText = status.error;
+                    botMsg.appendChild(statusDiv);
+                }
+
+                scrollChatToBottom();
+            }
+        })
+        .catch(error => {
+            console.error('Error polling status:', error);
+            // Don't stop polling on error, just log it
+        });
+
+        // If we've been polling for a long time without completion,
+        // still reload but at a slower interval (after 30 seconds)
+        if (pollCount > 60) { // 30 seconds (if polling every 500ms)
+            clearInterval(pollInterval);
+            console.log('Polling timeout reached, refreshing page');
+            setTimeout(() => {
+                window.location.reload();
+            }, 1000);
+        }
+    }, 500); // Poll every 500ms
+}
+
+// Call functions when page loads
+window.onload = function() {
+    scrollChatToBottom();
+
+    // Initialize diagrams with a delay to ensure DOM is fully loaded
+    setTimeout(initMermaidDiagrams, 300);
+
+    // Show diagram notification
+    setTimeout(checkAndShowDiagramNotification, 500);
+
+    // Setup dark mode toggle
+    setupDarkModeToggle();
+
+    // Setup session management
+    setupSessionManagement();
+
+    // Setup AJAX question form
+    setupQuestionFormAjax();
+};
@@ -0,0 +1,24 @@
+import os
+
+import flask_app
+
+
+def make_document(tmp_path, name, content):
+    """Write a chunk file for a document and return its storage entry."""
+    path = str(tmp_path / f"{name}.pkl")
+    flask_app.write_pickle_file(path, [{"content": content, "metadata": {"source": name}}])
+    return {"file": path}
+
+
+def test_missing_chunk_file_only_drops_its_document(tmp_path, monkeypatch):
+    documents = {
+        "kept.pdf": make_document(tmp_path, "kept", "still here"),
+        "lost.pdf": make_document(tmp_path, "lost", "gone"),
+    }
+    monkeypatch.setattr(flask_app, "storage", {"sessions": {"s1": {"documents": documents}}})
+    os.remove(documents["lost.pdf"]["file"])
+
+    result = flask_app.get_document_chunks("s1")
+
+    assert list(result) == ["kept.pdf"]
+    assert result["kept.pdf"][0]["content"] == "still here"
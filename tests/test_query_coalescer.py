@@ -0,0 +1,65 @@
+import threading
+import time
+
+import numpy as np
+
+import flask_app
+
+
+class BlockingIndex:
+    """Fake FAISS index whose first search blocks until released."""
+
+    def __init__(self):
+        self.batch_sizes = []
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def search(self, queries, k):
+        self.batch_sizes.append(len(queries))
+        if len(self.batch_sizes) == 1:
+            self.started.set()
+            self.release.wait(5)
+        # Each query's "nearest neighbour" is its own first value, so rows can be told apart
+        indices = np.repeat(queries[:, :1].astype(np.int64), k, axis=1)
+        return np.zeros((len(queries), k), dtype=np.float32), indices
+
+
+def test_idle_index_is_searched_without_waiting():
+    index = BlockingIndex()
+    index.release.set()
+    coalescer = flask_app.QueryCoalescer()
+
+    _, indices = coalescer.search(index, np.array([[7.0]]), 3)
+
+    assert index.batch_sizes == [1]
+    assert indices.tolist() == [[7, 7, 7]]
+
+
+def test_searches_queued_behind_a_running_search_share_one_call():
+    index = BlockingIndex()
+    coalescer = flask_app.QueryCoalescer()
+    results = {}
+
+    def run(value, k):
+        results[value] = coalescer.search(index, np.array([[float(value)]]), k)[1]
+
+    first = threading.Thread(target=run, args=(1, 2))
+    first.start()
+    assert index.started.wait(5)
+
+    queued = [threading.Thread(target=run, args=(value, k)) for value, k in ((2, 1), (3, 2))]
+    for thread in queued:
+        thread.start()
+    deadline = time.time() + 5
+    while len(coalescer._pending[id(index)]) < 2 and time.time() < deadline:
+        time.sleep(0.001)
+
+    index.release.set()
+    for thread in [first] + queued:
+        thread.join(5)
+
+    assert index.batch_sizes == [1, 2]
+    assert results[1].tolist() == [[1, 1]]
+    assert results[2].tolist() == [[2]]
+    assert results[3].tolist() == [[3, 3]]
+    assert coalescer._pending == {}
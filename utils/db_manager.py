@@ -298,9 +298,7 @@ def get_vector_store(session_id=None):
         Vector store object if found, None otherwise
     """
     try:
-        from utils.vector_store import get_embedding
-        import numpy as np
-        import faiss
+        from utils.vector_store import embed_chunks, build_index
         
         if session_id is None:
             session_id = get_current_session()
@@ -314,27 +312,19 @@ def get_vector_store(session_id=None):
         if not stored_chunks:
             return None
         
-        # Generate embeddings for the chunks
-        embeddings = []
-        for chunk in stored_chunks:
-            embedding = get_embedding(chunk["content"])
-            if embedding is not None:
-                embeddings.append(embedding)
+        # Generate embeddings for the chunks; rows stay aligned with embedded_chunks
+        embeddings_array, embedded_chunks = embed_chunks(stored_chunks)
         
-        if not embeddings:
+        if embeddings_array is None:
             return None
             
-        # Convert to numpy array and create FAISS index
-        embeddings_array = np.array(embeddings).astype('float32')
-        dimension = embeddings_array.shape[1]
-        index = faiss.IndexFlatL2(dimension)
-        index.add(embeddings_array)
+        # Create FAISS index
+        index = build_index(embeddings_array)
         
         # Return reconstructed vector store
         return {
             "index": index,
-            "chunks": stored_chunks,
-            "embeddings": embeddings_array
+            "chunks": embedded_chunks
         }
     except Exception as e:
         print(f"Error retrieving vector store: {str(e)}")
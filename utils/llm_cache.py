@@ -0,0 +1,109 @@
+"""
+Exact-match cache for chat completions.
+
+Completions are keyed by a hash of the model, temperature and prompt messages.
+The prompt includes the retrieved document excerpts, so a repeated question over
+the same documents is answered from memory or a local SQLite file instead of
+another OpenAI round trip.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+
+CACHE_PATH = os.path.join("data_storage", "llm_cache.db")
+MEMORY_CACHE_SIZE = 4096  # Most recently used completions kept in process
+
+_memory_cache = OrderedDict()
+_lock = threading.Lock()
+_connection = None
+
+# Hit/miss counters for tuning
+stats = {"hits": 0, "misses": 0}
+
+def _get_connection():
+    """Open the SQLite cache file on first use."""
+    global _connection
+    if _connection is None:
+        os.makedirs(os.path.dirname(CACHE_PATH), exist_ok=True)
+        _connection = sqlite3.connect(CACHE_PATH, check_same_thread=False)
+        _connection.execute(
+            "CREATE TABLE IF NOT EXISTS completions (key TEXT PRIMARY KEY, response TEXT NOT NULL)"
+        )
+    return _connection
+
+def _remember(key, response):
+    """Add a completion to the in-process LRU, evicting the oldest if full."""
+    _memory_cache[key] = response
+    _memory_cache.move_to_end(key)
+    if len(_memory_cache) > MEMORY_CACHE_SIZE:
+        _memory_cache.popitem(last=False)
+
+def make_cache_key(model, temperature, messages):
+    """
+    Build the cache key for a chat completion request.
+
+    Args:
+        model: The chat model name
+        temperature: The sampling temperature, or None for the API default
+        messages: The list of chat messages sent to the model
+
+    Returns:
+        A hex digest identifying the request
+    """
+    payload = json.dumps([model, temperature, messages], sort_keys=True)
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=32).hexdigest()
+
+def get_cached_completion(key):
+    """
+    Look up a cached completion.
+
+    Args:
+        key: A key from make_cache_key
+
+    Returns:
+        The cached completion text, or None on a miss
+    """
+    with _lock:
+        if key in _memory_cache:
+            _memory_cache.move_to_end(key)
+            stats["hits"] += 1
+            return _memory_cache[key]
+
+        try:
+            row = _get_connection().execute(
+                "SELECT response FROM completions WHERE key = ?", (key,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            print(f"Error reading LLM cache: {e}")
+            row = None
+
+        if row is None:
+            stats["misses"] += 1
+            return None
+
+        stats["hits"] += 1
+        _remember(key, row[0])
+        return row[0]
+
+def store_completion(key, response):
+    """
+    Cache a completion in memory and on disk.
+
+    Args:
+        key: A key from make_cache_key
+        response: The completion text
+    """
+    with _lock:
+        _remember(key, response)
+        try:
+            connection = _get_connection()
+            with connection:
+                connection.execute(
+                    "INSERT OR REPLACE INTO completions (key, response) VALUES (?, ?)", (key, response)
+                )
+        except sqlite3.Error as e:
+            print(f"Error writing LLM cache: {e}")
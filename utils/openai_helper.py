@@ -1,11 +1,88 @@
 import os
+import functools
 import logging
 from openai import OpenAI
+import httpx
 import json
+import re
 
-# Initialize the OpenAI client
+from utils.llm_cache import make_cache_key, get_cached_completion, store_completion
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+try:
+    import h2  # noqa: F401 - lets httpx multiplex requests over HTTP/2
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# Initialize the OpenAI client with a pooled, keep-alive HTTP client
 OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY")
-client = OpenAI(api_key=OPENAI_API_KEY)
+http_client = httpx.Client(
+    http2=HTTP2_AVAILABLE,
+    limits=httpx.Limits(max_connections=20, max_keepalive_connections=20),
+    timeout=60
+)
+client = OpenAI(api_key=OPENAI_API_KEY, http_client=http_client)
+
+# Maximum prompt tokens spent on document excerpts
+CONTEXT_TOKEN_BUDGET = 6000
+CHARS_PER_TOKEN = 4  # Rough estimate used when tiktoken isn't available
+
+@functools.lru_cache(maxsize=4)
+def get_tokenizer(model):
+    """Load a model's tokenizer once, or return None if tiktoken can't provide it."""
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except Exception as e:
+        logging.warning(f"Could not load tokenizer for {model}, estimating token counts: {str(e)}")
+        return None
+
+def limit_context(contexts, max_tokens=CONTEXT_TOKEN_BUDGET):
+    """
+    Keep the leading context texts that fit within a token budget.
+    
+    Chunks are expected in relevance order, so the tail is dropped first. The
+    first text is truncated rather than dropped if it alone exceeds the budget.
+    
+    Args:
+        contexts: List of context strings
+        max_tokens: Maximum number of tokens to keep
+        
+    Returns:
+        The list of context strings to include in the prompt
+    """
+    tokenizer = get_tokenizer("gpt-4o")
+    kept = []
+    remaining = max_tokens
+    
+    for text in contexts:
+        if tokenizer is not None:
+            tokens = tokenizer.encode(text)
+            cost = len(tokens)
+        else:
+            cost = len(text) // CHARS_PER_TOKEN
+            
+        if cost > remaining:
+            if not kept:
+                if tokenizer is not None:
+                    kept.append(tokenizer.decode(tokens[:remaining]))
+                else:
+                    kept.append(text[:remaining * CHARS_PER_TOKEN])
+            break
+            
+        kept.append(text)
+        remaining -= cost
+    
+    return kept
+
+# Returned by generate_answer when the API call fails
+ANSWER_ERROR_MESSAGE = "I'm sorry, but I encountered an error when trying to generate an answer. Please try again."
 
 def generate_answer(question, context_chunks):
     """
@@ -24,26 +101,35 @@ def generate_answer(question, context_chunks):
         sources = set()
         
         # Check if chunks already have metadata or if they're plain strings
-        if context_chunks and isinstance(context_chunks[0], dict) and "content" in context_chunks[0]:
+        has_metadata = context_chunks and isinstance(context_chunks[0], dict) and "content" in context_chunks[0]
+        if has_metadata:
             # Chunks with metadata
             for chunk in context_chunks:
                 contexts.append(chunk["content"])
-                source = f"{chunk['metadata']['source']}, page {chunk['metadata']['page']}"
-                sources.add(source)
         else:
             # Plain text chunks (for backward compatibility)
-            for i, chunk in enumerate(context_chunks):
+            for chunk in context_chunks:
                 if isinstance(chunk, dict):
                     contexts.append(str(chunk))
                 else:
                     contexts.append(chunk)
+        
+        # Keep only as much context as fits the token budget
+        contexts = limit_context(contexts)
+        
+        # Only cite the chunks that made it into the prompt
+        for i, chunk in enumerate(context_chunks[:len(contexts)]):
+            if has_metadata:
+                sources.add(f"{chunk['metadata']['source']}, page {chunk['metadata']['page']}")
+            else:
                 sources.add(f"Document chunk {i+1}")
         
         # Join the context texts
         context_text = "\n\n".join(contexts)
         
         # Format source references
-        source_references = "\n".join([f"- {source}" for source in sources])
+        # Sorted so the prompt (and its cache key) is the same on every run
+        source_references = "\n".join([f"- {source}" for source in sorted(sources)])
         
         # Create the system message
         system_message = (
@@ -67,23 +153,33 @@ Sources:
 Based ONLY on the document excerpts above, provide a clear and comprehensive answer to the question.
 """
         
+        messages = [
+            {"role": "system", "content": system_message},
+            {"role": "user", "content": user_message}
+        ]
+        
+        # Identical prompts (same question over the same excerpts) skip the API call
+        cache_key = make_cache_key("gpt-4o", 0.2, messages)
+        cached_answer = get_cached_completion(cache_key)
+        if cached_answer is not None:
+            return cached_answer
+        
         # the newest OpenAI model is "gpt-4o" which was released May 13, 2024.
         # do not change this unless explicitly requested by the user
         response = client.chat.completions.create(
             model="gpt-4o",
-            messages=[
-                {"role": "system", "content": system_message},
-                {"role": "user", "content": user_message}
-            ],
+            messages=messages,
             temperature=0.2,  # Lower temperature for more factual responses
             max_tokens=800
         )
         
-        return response.choices[0].message.content
+        answer = response.choices[0].message.content
+        store_completion(cache_key, answer)
+        return answer
     
     except Exception as e:
         logging.error(f"Error generating answer: {str(e)}")
-        return "I'm sorry, but I encountered an error when trying to generate an answer. Please try again."
+        return ANSWER_ERROR_MESSAGE
 
 def generate_diagram(question, context_chunks, diagram_type="flowchart"):
     """
@@ -114,8 +210,8 @@ def generate_diagram(question, context_chunks, diagram_type="flowchart"):
                 else:
                     contexts.append(chunk)
         
-        # Join the context texts
-        context_text = "\n\n".join(contexts)
+        # Join the context texts, keeping only as much as fits the token budget
+        context_text = "\n\n".join(limit_context(contexts))
         
         # Define diagram templates
         diagram_templates = {
@@ -200,6 +296,23 @@ Remember to focus ONLY on what is explicitly stated in the documents.
         logging.error(error_msg)
         return False, error_msg
 
+# Keywords that might indicate a request for visualization
+DIAGRAM_KEYWORDS = [
+    "diagram", "visual", "visualize", "flow", "flowchart", "chart", 
+    "graph", "illustration", "visualisation", "visualization", "map", 
+    "picture", "schematic", "sequence", "workflow", "process flow",
+    "mind map", "relationship", "hierarchy", "structure", "framework",
+    "concept map", "organize", "draw", "illustrate", "sketch", "create a visual",
+    "graphical", "representation"
+]
+
+# Each keyword list is compiled once into a single alternation, so a question
+# is scanned in one pass per list instead of once per keyword
+DIAGRAM_REQUEST_RE = re.compile("|".join(map(re.escape, DIAGRAM_KEYWORDS)), re.IGNORECASE)
+SEQUENCE_DIAGRAM_RE = re.compile("sequence|timeline|step by step", re.IGNORECASE)
+MINDMAP_DIAGRAM_RE = re.compile("mind map|concept map|brain", re.IGNORECASE)
+CLASS_DIAGRAM_RE = re.compile("class|object|entity", re.IGNORECASE)
+
 def detect_diagram_request(question):
     """
     Detect if a user question is requesting a diagram or visualization.
@@ -210,25 +323,14 @@ def detect_diagram_request(question):
     Returns:
         A tuple of (is_diagram_request, diagram_type)
     """
-    # Keywords that might indicate a request for visualization
-    diagram_keywords = [
-        "diagram", "visual", "visualize", "flow", "flowchart", "chart", 
-        "graph", "illustration", "visualisation", "visualization", "map", 
-        "picture", "schematic", "sequence", "workflow", "process flow",
-        "mind map", "relationship", "hierarchy", "structure", "framework",
-        "concept map", "organize", "draw", "illustrate", "sketch", "create a visual",
-        "graphical", "representation"
-    ]
-    
     # Check if any of the diagram keywords are in the question
-    question_lower = question.lower()
-    if any(keyword in question_lower for keyword in diagram_keywords):
+    if DIAGRAM_REQUEST_RE.search(question):
         # Determine the diagram type based on the question
-        if any(term in question_lower for term in ["sequence", "timeline", "step by step"]):
+        if SEQUENCE_DIAGRAM_RE.search(question):
             return True, "sequence"
-        elif any(term in question_lower for term in ["mind map", "concept map", "brain"]):
+        elif MINDMAP_DIAGRAM_RE.search(question):
             return True, "mindmap"
-        elif any(term in question_lower for term in ["class", "object", "entity"]):
+        elif CLASS_DIAGRAM_RE.search(question):
             return True, "classDiagram"
         else:
             return True, "flowchart"  # Default to flowchart
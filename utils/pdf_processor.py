@@ -2,9 +2,36 @@ import io
 import PyPDF2
 import streamlit as st
 
+try:
+    import pymupdf  # Much faster text extraction than PyPDF2 when installed
+except ImportError:
+    pymupdf = None
+
+def iter_page_texts(pdf_bytes):
+    """
+    Yield the text of each page of a PDF, in page order.
+    
+    Args:
+        pdf_bytes: The raw PDF file contents
+        
+    Returns:
+        A generator of page text strings
+    """
+    if pymupdf is not None:
+        # MuPDF parses in C; plain text extraction skips layout analysis
+        text_flags = pymupdf.TEXT_DEHYPHENATE | pymupdf.TEXT_MEDIABOX_CLIP
+        with pymupdf.open(stream=pdf_bytes, filetype="pdf") as doc:
+            for page in doc:
+                yield page.get_text("text", flags=text_flags)
+        return
+    
+    reader = PyPDF2.PdfReader(io.BytesIO(pdf_bytes))
+    for page in reader.pages:
+        yield page.extract_text()
+
 def extract_text_from_pdf(file):
     """
-    Extract text from a single PDF file using PyPDF2.
+    Extract text from a single PDF file using PyMuPDF, or PyPDF2 if it isn't installed.
     
     Args:
         file: A file-like object containing the PDF
@@ -13,15 +40,9 @@ def extract_text_from_pdf(file):
         A list of text chunks from the document
     """
     try:
-        file_stream = io.BytesIO(file.getvalue())
-        reader = PyPDF2.PdfReader(file_stream)
-        
         text_chunks = []
         
-        for page_num in range(len(reader.pages)):
-            page = reader.pages[page_num]
-            text = page.extract_text()
-            
+        for page_num, text in enumerate(iter_page_texts(file.getvalue())):
             # Skip empty pages
             if not text or not text.strip():
                 continue
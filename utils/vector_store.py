@@ -3,12 +3,17 @@ import faiss
 import streamlit as st
 import openai
 import os
+from concurrent.futures import ThreadPoolExecutor
 from openai import OpenAI
 
 # Initialize the OpenAI client
 OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY")
 client = OpenAI(api_key=OPENAI_API_KEY)
 
+EMBEDDING_MODEL = "text-embedding-ada-002"  # Using Ada embedding model
+EMBEDDING_BATCH_SIZE = 96  # Texts sent per embeddings request
+EMBEDDING_MAX_CONCURRENCY = 8  # Requests in flight at once
+
 def get_embedding(text):
     """
     Get the embedding for a text using OpenAI's embeddings API.
@@ -22,7 +27,7 @@ def get_embedding(text):
     try:
         response = client.embeddings.create(
             input=text,
-            model="text-embedding-ada-002"  # Using Ada embedding model
+            model=EMBEDDING_MODEL
         )
         embedding = response.data[0].embedding
         return np.array(embedding, dtype=np.float32)
@@ -30,6 +35,88 @@ def get_embedding(text):
         st.error(f"Error generating embedding: {str(e)}")
         return None
 
+def embed_chunks(chunks):
+    """
+    Embed chunk contents into one contiguous float32 matrix.
+    
+    Args:
+        chunks: List of document chunks, each with "content" and "metadata"
+        
+    Returns:
+        An (embeddings_array, embedded_chunks) pair whose rows line up,
+        or (None, []) if nothing could be embedded
+    """
+    # Skip chunks with no content; the embeddings endpoint rejects empty inputs
+    chunks = [chunk for chunk in chunks if chunk.get("content")]
+    batches = [chunks[i:i + EMBEDDING_BATCH_SIZE] for i in range(0, len(chunks), EMBEDDING_BATCH_SIZE)]
+    
+    def embed_batch(batch):
+        try:
+            response = client.embeddings.create(
+                input=[chunk["content"] for chunk in batch],
+                model=EMBEDDING_MODEL
+            )
+            # Data items carry the index of their input
+            return {item.index: item.embedding for item in response.data}, None
+        except Exception as e:
+            # Worker threads have no Streamlit script context, so errors are reported by the caller
+            return {}, str(e)
+    
+    # Each request carries a whole batch, and a few batches are in flight at once.
+    # map() yields results in submission order, keeping rows aligned with chunks.
+    with ThreadPoolExecutor(max_workers=EMBEDDING_MAX_CONCURRENCY) as executor:
+        results = list(executor.map(embed_batch, batches))
+    
+    for _, error in results:
+        if error is not None:
+            st.error(f"Error generating embeddings: {error}")
+    
+    embeddings_array = None
+    embedded_chunks = []
+    
+    for batch, (batch_embeddings, _) in zip(batches, results):
+        for i, chunk in enumerate(batch):
+            if i not in batch_embeddings:
+                continue
+            
+            # Rows are written straight into an (N, d) matrix instead of stacking per-chunk arrays
+            if embeddings_array is None:
+                embeddings_array = np.empty((len(chunks), len(batch_embeddings[i])), dtype=np.float32)
+            embeddings_array[len(embedded_chunks)] = batch_embeddings[i]
+            embedded_chunks.append(chunk)
+    
+    if embeddings_array is None:
+        return None, []
+    return embeddings_array[:len(embedded_chunks)], embedded_chunks
+
+# Larger collections store int8 codes, a quarter of the bytes scanned per query
+SQ_MIN_VECTORS = 1000
+
+def build_index(embeddings_array):
+    """
+    Build a cosine-similarity FAISS index over embeddings.
+    
+    Args:
+        embeddings_array: 2D float32 array of embeddings, normalized in place
+        
+    Returns:
+        A faiss.IndexFlatIP, or an int8 faiss.IndexScalarQuantizer for
+        SQ_MIN_VECTORS or more embeddings, containing the embeddings
+    """
+    # On unit vectors inner product is cosine similarity, scored by FAISS's SIMD kernels
+    faiss.normalize_L2(embeddings_array)
+    num_vectors, dimension = embeddings_array.shape
+    
+    if num_vectors < SQ_MIN_VECTORS:
+        index = faiss.IndexFlatIP(dimension)
+    else:
+        index = faiss.IndexScalarQuantizer(dimension, faiss.ScalarQuantizer.QT_8bit, faiss.METRIC_INNER_PRODUCT)
+        # The scalar quantizer learns per-dimension ranges from the data
+        index.train(embeddings_array)
+    
+    index.add(embeddings_array)
+    return index
+
 def create_vector_store(chunks):
     """
     Create a FAISS vector store from text chunks.
@@ -45,53 +132,22 @@ def create_vector_store(chunks):
             st.warning("No chunks provided to create vector store.")
             return {"chunks": []}  # Return empty store instead of None
         
-        # Extract text content from chunks
-        processed_chunks = []
-        embeddings = []
-        
-        # Process chunks in smaller batches to avoid timeouts
-        max_batch_size = 10
-        total_chunks = len(chunks)
-        
-        for i in range(0, total_chunks, max_batch_size):
-            batch_end = min(i + max_batch_size, total_chunks)
-            st.info(f"Processing chunks {i+1} to {batch_end} of {total_chunks}")
-            
-            for j in range(i, batch_end):
-                chunk = chunks[j]
-                try:
-                    # Skip chunks with no content
-                    if not chunk.get("content"):
-                        continue
-                    
-                    # Get embedding for the chunk
-                    embedding = get_embedding(chunk["content"])
-                    if embedding is not None:
-                        embeddings.append(embedding)
-                        processed_chunks.append(chunk)
-                except Exception as chunk_error:
-                    st.warning(f"Error processing chunk {j+1}: {str(chunk_error)}")
-                    continue  # Skip this chunk and continue
+        st.info(f"Processing {len(chunks)} chunks")
+        embeddings_array, processed_chunks = embed_chunks(chunks)
         
         # Return early if no embeddings were created
-        if not embeddings:
+        if embeddings_array is None:
             st.warning("Could not create any embeddings. Returning chunks only.")
             return {"chunks": processed_chunks}
         
         try:
-            # Convert list of embeddings to a 2D numpy array
-            embeddings_array = np.array(embeddings).astype('float32')
-            
             # Create the FAISS index
-            dimension = embeddings_array.shape[1]  # Get the dimensionality of the embeddings
-            index = faiss.IndexFlatL2(dimension)  # Using L2 distance for similarity
-            index.add(embeddings_array)
+            index = build_index(embeddings_array)
             
-            # Return a dictionary with the index and associated data
+            # The index holds its own copy of the vectors, so the matrix isn't kept
             return {
                 "index": index,
-                "chunks": processed_chunks,  # Only include chunks that have embeddings
-                "embeddings": embeddings_array
+                "chunks": processed_chunks  # Only include chunks that have embeddings
             }
         except Exception as array_error:
             st.warning(f"Error creating index: {str(array_error)}")
@@ -143,30 +199,14 @@ def get_similar_chunks(query, vector_store, top_k=5):
                         vector_store = db_vector_store
                     else:
                         # Build a new index from chunks
-                        embeddings = []
-                        valid_chunks = []
-                        
-                        # Process in smaller batches
-                        max_batch = 10
-                        for i in range(0, len(chunks), max_batch):
-                            batch = chunks[i:i+max_batch]
-                            for chunk in batch:
-                                if "content" in chunk:
-                                    embedding = get_embedding(chunk["content"])
-                                    if embedding is not None:
-                                        embeddings.append(embedding)
-                                        valid_chunks.append(chunk)
+                        embeddings_array, valid_chunks = embed_chunks(chunks)
                         
-                        if embeddings:
+                        if embeddings_array is not None:
                             # Build the index
-                            embeddings_array = np.array(embeddings).astype('float32')
-                            dimension = embeddings_array.shape[1]
-                            index = faiss.IndexFlatL2(dimension)
-                            index.add(embeddings_array)
+                            index = build_index(embeddings_array)
                             
                             # Update vector_store
                             vector_store["index"] = index
-                            vector_store["embeddings"] = embeddings_array
                             vector_store["chunks"] = valid_chunks
                         else:
                             # Fallback to keyword matching if we can't build the index
@@ -215,8 +255,9 @@ def get_similar_chunks(query, vector_store, top_k=5):
                         matched_chunks.append(chunk)
                 return matched_chunks[:min(top_k, len(matched_chunks))]
             
-            # Reshape query embedding to match FAISS requirements
-            query_embedding = np.array([query_embedding]).astype('float32')
+            # Reshape query embedding to match FAISS requirements and normalize it like the index
+            query_embedding = np.ascontiguousarray(query_embedding.reshape(1, -1), dtype=np.float32)
+            faiss.normalize_L2(query_embedding)
             
             try:
                 # Search the index